@@ -0,0 +1,46 @@
+"""user
+
+The user table as the app first created it with create_all. Databases that
+already have it skip the create, later revisions bring it up to date.
+
+Revision ID: 0c4f8a2e6b19
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0c4f8a2e6b19"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("first_name", sa.String(length=256), nullable=True),
+        sa.Column("surname", sa.String(length=256), nullable=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        op.f("ix_user_id"), "user", ["id"], unique=False, if_not_exists=True
+    )
+    op.create_index(
+        op.f("ix_user_email"), "user", ["email"], unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_user_email"), table_name="user")
+    op.drop_index(op.f("ix_user_id"), table_name="user")
+    op.drop_table("user")
@@ -0,0 +1,59 @@
+"""revoked token
+
+Ids of access tokens revoked on logout, kept until the tokens expire.
+
+Revision ID: 3d9a6f0c2b71
+Revises: 8c3e7b2a1f60
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3d9a6f0c2b71"
+down_revision = "8c3e7b2a1f60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revokedtoken",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jti", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "revoked_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("jti"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        op.f("ix_revokedtoken_id"),
+        "revokedtoken",
+        ["id"],
+        unique=False,
+        if_not_exists=True,
+    )
+    op.create_index(
+        op.f("ix_revokedtoken_expires_at"),
+        "revokedtoken",
+        ["expires_at"],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_revokedtoken_expires_at"), table_name="revokedtoken")
+    op.drop_index(op.f("ix_revokedtoken_id"), table_name="revokedtoken")
+    op.drop_table("revokedtoken")
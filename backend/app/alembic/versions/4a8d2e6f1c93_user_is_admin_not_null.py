@@ -0,0 +1,40 @@
+"""user is_admin not null
+
+Users without a flag are not admins, the column never holds NULL.
+
+Revision ID: 4a8d2e6f1c93
+Revises: e1f7c3b9a2d4
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4a8d2e6f1c93"
+down_revision = "e1f7c3b9a2d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('UPDATE "user" SET is_admin = false WHERE is_admin IS NULL')
+    op.alter_column(
+        "user",
+        "is_admin",
+        existing_type=sa.Boolean(),
+        server_default=sa.false(),
+        nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "user",
+        "is_admin",
+        existing_type=sa.Boolean(),
+        server_default=None,
+        nullable=True,
+    )
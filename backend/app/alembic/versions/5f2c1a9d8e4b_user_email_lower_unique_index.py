@@ -0,0 +1,55 @@
+"""user email lower unique index
+
+Replaces the plain index on user.email with a unique index on lower(email),
+which serves the case-insensitive login lookup and the ON CONFLICT target
+used by signup. Emails that only differ by letter case have to be merged
+before upgrading, otherwise the index build fails.
+
+Revision ID: 5f2c1a9d8e4b
+Revises: 0c4f8a2e6b19
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5f2c1a9d8e4b"
+down_revision = "0c4f8a2e6b19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the user table writable while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email_lower",
+            "user",
+            [sa.text("lower(email)")],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_user_email",
+            table_name="user",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_email",
+            "user",
+            ["email"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_user_email_lower", table_name="user", postgresql_concurrently=True
+        )
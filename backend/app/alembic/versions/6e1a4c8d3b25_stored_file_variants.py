@@ -0,0 +1,27 @@
+"""stored file variants
+
+Widths of the pre-rendered variants of an image by format, as uploaded.
+
+Revision ID: 6e1a4c8d3b25
+Revises: 9b5e3f7a2c18
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "6e1a4c8d3b25"
+down_revision = "9b5e3f7a2c18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("storedfile", sa.Column("variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("storedfile", "variants")
@@ -0,0 +1,53 @@
+"""stored file
+
+Content addressed uploads: one row per distinct upload with the number of
+places referencing it.
+
+Revision ID: 8c3e7b2a1f60
+Revises: 5f2c1a9d8e4b
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8c3e7b2a1f60"
+down_revision = "5f2c1a9d8e4b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "storedfile",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("object_key", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(length=256), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("hash"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        op.f("ix_storedfile_id"), "storedfile", ["id"], unique=False, if_not_exists=True
+    )
+    op.create_index(
+        op.f("ix_storedfile_object_key"),
+        "storedfile",
+        ["object_key"],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_storedfile_object_key"), table_name="storedfile")
+    op.drop_index(op.f("ix_storedfile_id"), table_name="storedfile")
+    op.drop_table("storedfile")
@@ -0,0 +1,41 @@
+"""stored file status
+
+Uploads are committed as pending and marked ready once stored, instead of
+holding a transaction open while uploading.
+
+Revision ID: 9b5e3f7a2c18
+Revises: 4a8d2e6f1c93
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b5e3f7a2c18"
+down_revision = "4a8d2e6f1c93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every existing row was committed after its upload
+    op.add_column(
+        "storedfile",
+        sa.Column(
+            "status", sa.String(length=16), server_default="ready", nullable=False
+        ),
+    )
+    op.alter_column("storedfile", "status", server_default="pending")
+    op.add_column(
+        "storedfile",
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.alter_column("storedfile", "claimed_at", server_default=sa.text("now()"))
+
+
+def downgrade() -> None:
+    op.drop_column("storedfile", "claimed_at")
+    op.drop_column("storedfile", "status")
@@ -0,0 +1,30 @@
+"""user version
+
+Row version of users, bumped on every update and used for ETags.
+
+Revision ID: b7e4d2a9c516
+Revises: 3d9a6f0c2b71
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e4d2a9c516"
+down_revision = "3d9a6f0c2b71"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "version")
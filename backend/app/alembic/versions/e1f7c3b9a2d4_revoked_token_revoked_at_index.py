@@ -0,0 +1,44 @@
+"""revoked token revoked_at index
+
+Revocations are picked up by revocation time, which is always set.
+
+Revision ID: e1f7c3b9a2d4
+Revises: b7e4d2a9c516
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e1f7c3b9a2d4"
+down_revision = "b7e4d2a9c516"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE revokedtoken SET revoked_at = now() WHERE revoked_at IS NULL")
+    op.alter_column(
+        "revokedtoken",
+        "revoked_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=False,
+    )
+    op.create_index(
+        op.f("ix_revokedtoken_revoked_at"), "revokedtoken", ["revoked_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_revokedtoken_revoked_at"), table_name="revokedtoken")
+    op.alter_column(
+        "revokedtoken",
+        "revoked_at",
+        existing_type=sa.DateTime(timezone=True),
+        existing_server_default=sa.text("now()"),
+        nullable=True,
+    )
@@ -1,47 +1,96 @@
+from datetime import datetime, timezone
+from typing import Optional
+
 from core.auth import create_access_token, authenticate
+from core.revocation import revocation_list
 from crud.crud_user import crud_user
-from api.deps import get_db, get_current_user
+from api.deps import get_async_db, get_current_user, get_token_payload
 from core.exceptions import get_user_exception
 from fastapi import APIRouter
+from fastapi import BackgroundTasks
 from fastapi import Depends
+from fastapi import Header
+from fastapi import Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from models.user import User
-from schemas.auth import Token
-from schemas.user import UserInDB, UserCreate
+from schemas.auth import Token, token_serializer
+from schemas.user import UserInDB, UserCreate, user_serializer
 
 router = APIRouter()
 
 
 @router.post("/login/", status_code=status.HTTP_200_OK, response_model=Token)
-def login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
+async def login(
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
+) -> Response:
     """
     Getting the JWT for a user with data from oauth2 request body
+    :param background_tasks: used to rehash outdated password hashes after the response
     :param db: Database connection required
     :param form_data: request body data
     :return: Access Token JWT
     """
-    user = authenticate(email=form_data.username, password=form_data.password, db=db)
+    user = await authenticate(
+        email=form_data.username,
+        password=form_data.password,
+        db=db,
+        background_tasks=background_tasks,
+    )
     if not user:
         raise get_user_exception()
 
-    return Token(access_token=create_access_token(sub=user.id), token_type="bearer")
+    return token_serializer.response(
+        Token.model_construct(
+            access_token=create_access_token(sub=user.id), token_type="bearer"
+        )
+    )
 
 
-@router.get("/me/", response_model=UserInDB, status_code=status.HTTP_200_OK)
-def read_users_me(current_user: User = Depends(get_current_user)) -> User:
+@router.post("/logout/", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_async_db),
+) -> None:
     """
-    Fetch the current logged in user.
+    Revoke the token used for this request, it is rejected until it expires.
     """
 
-    return current_user
+    if jti := payload.get("jti"):
+        await revocation_list.revoke(
+            db,
+            jti=jti,
+            user_id=int(payload["sub"]),
+            expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+        )
+
+
+@router.get("/me/", response_model=UserInDB, status_code=status.HTTP_200_OK)
+async def read_users_me(
+    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """
+    Fetch the current logged in user, 304 when the client's ETag is current.
+    """
+    # The cached user may predate an update made by another process
+    current_user = await crud_user.arevalidate(db, current_user)
+    if current_user is None:
+        raise get_user_exception()
+    return user_serializer.conditional_response(current_user, if_none_match)
 
 
 @router.post("/signup/", status_code=201, response_model=UserInDB)
-def create_user_signup(user_in: UserCreate, db: Session = Depends(get_db)) -> UserInDB:
+async def create_user_signup(
+    user_in: UserCreate, db: AsyncSession = Depends(get_async_db)
+) -> Response:
     """
     Create new user without the need to be logged in.
     """
 
-    return crud_user.create(db=db, obj_in=user_in)
+    user: User = await crud_user.acreate(db=db, obj_in=user_in)
+    return user_serializer.response(user, status_code=status.HTTP_201_CREATED)
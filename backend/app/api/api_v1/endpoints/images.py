@@ -0,0 +1,92 @@
+from typing import Literal, Optional
+
+from api.deps import get_async_db
+from core.cache import get_image_cache
+from core.config import settings
+from core.exceptions import file_too_large, object_does_not_exist
+from core.images import (
+    ImageTooLarge,
+    UploadTooLarge,
+    image_handler,
+    image_variant_formats,
+    render_width,
+)
+from core.workers import image_pool
+from crud.crud_stored_file import crud_stored_file
+from models.stored_file import READY
+from fastapi import APIRouter
+from fastapi import Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter()
+
+IMAGE_MAX_WIDTH: int = 4096
+# Requested widths are rounded up to one of these, so arbitrary widths can
+# neither bust the cache nor keep the image pool busy
+IMAGE_WIDTHS: tuple[int, ...] = tuple(
+    sorted(
+        {64, 128, 256, 480, 960, 1920, 2560, IMAGE_MAX_WIDTH}
+        | {width for width in settings.image_variant_widths if width <= IMAGE_MAX_WIDTH}
+    )
+)
+# Object keys are content addressed, so a rendered size never changes
+CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+
+
+def negotiate_format(accept: str) -> str:
+    """Smallest format the client accepts, PNG when it names none of ours."""
+    for fmt in ("avif", "webp"):
+        if fmt in image_variant_formats() and f"image/{fmt}" in accept:
+            return fmt
+    return "png"
+
+
+def snap_width(width: int) -> int:
+    """Smallest served width that is at least `width`."""
+    return next(w for w in IMAGE_WIDTHS if w >= width)
+
+
+@router.get("/{object_key:path}", response_class=FileResponse)
+async def read_resized_image(
+    object_key: str,
+    request: Request,
+    w: int = Query(..., ge=16, le=IMAGE_MAX_WIDTH),
+    fmt: Optional[Literal["png", "webp", "avif"]] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> FileResponse:
+    """
+    Serve a stored image at the next served width up from `w`, rendered from
+    the original and kept in a size bounded disk cache.
+    """
+    headers: dict[str, str] = {"Cache-Control": CACHE_CONTROL}
+    if fmt is None:
+        fmt = negotiate_format(request.headers.get("accept", ""))
+        headers["Vary"] = "Accept"
+    if fmt != "png" and fmt not in image_variant_formats():
+        fmt = "png"
+
+    # Checked before the cache, rendered sizes of released images are not served
+    stored_file = await crud_stored_file.aget_by_object_key(db, object_key=object_key)
+    if stored_file is None or stored_file.status != READY:
+        raise object_does_not_exist()
+
+    w = snap_width(w)
+    image_cache = get_image_cache()
+    cache_key: str = f"{object_key}:{w}:{fmt}"
+    if (path := image_cache.get(cache_key)) is None:
+        try:
+            original: bytes = await run_in_threadpool(
+                image_handler.read_original, object_key
+            )
+            data: bytes = await image_pool.run(
+                render_width, original, w, fmt, settings.image_max_pixels
+            )
+        except FileNotFoundError:
+            raise object_does_not_exist()
+        except (ImageTooLarge, UploadTooLarge):
+            raise file_too_large(detail="Image dimensions are too large.")
+        path = await run_in_threadpool(image_cache.set, cache_key, data)
+
+    return FileResponse(path, media_type=f"image/{fmt}", headers=headers)
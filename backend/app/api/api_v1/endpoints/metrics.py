@@ -0,0 +1,60 @@
+from api.deps import get_current_admin
+from core.cache import get_image_cache, user_cache
+from core.email import email_worker
+from core.media import media_files
+from core.revocation import revocation_list
+from core.tokens import verified_tokens
+from core.workers import hashing_pool, image_pool
+from db.pool import pool_stats
+from db.session import async_engine, engine, replica_router
+from fastapi import APIRouter
+from fastapi import Depends
+from starlette import status
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/cache/", status_code=status.HTTP_200_OK)
+def read_cache_metrics() -> dict:
+    """
+    Hit, miss and eviction counters of the in-process caches.
+    """
+
+    return {
+        "user": user_cache.stats(),
+        "images": get_image_cache().stats(),
+        "tokens": verified_tokens.stats(),
+        "revoked_tokens": revocation_list.stats(),
+        "media": media_files.hot_files.stats(),
+    }
+
+
+@router.get("/pools/", status_code=status.HTTP_200_OK)
+def read_pool_metrics() -> dict:
+    """
+    Queue depth, rejections and latency of the worker process pools.
+    """
+
+    return {"hashing": hashing_pool.stats(), "images": image_pool.stats()}
+
+
+@router.get("/db/", status_code=status.HTTP_200_OK)
+def read_db_pool_metrics() -> dict:
+    """
+    Connections in use, idle, overflow and checkout wait of the database pools.
+    """
+
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+        "replicas": replica_router.stats(),
+    }
+
+
+@router.get("/email/", status_code=status.HTTP_200_OK)
+def read_email_metrics() -> dict:
+    """
+    Queue depth, delivery counters and send latency of the email worker.
+    """
+
+    return email_worker.stats()
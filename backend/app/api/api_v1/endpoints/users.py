@@ -0,0 +1,71 @@
+from typing import List, Literal, Optional, Union
+
+from api.deps import get_async_db, get_current_admin
+from core.config import settings
+from core.versioning import collection_etag, is_not_modified
+from crud.crud_user import crud_user
+from fastapi import APIRouter
+from fastapi import Body
+from fastapi import Depends
+from fastapi import Header
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from schemas.page import Page
+from schemas.user import UserCreate, UserInDB
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/", response_model=Page[UserInDB], status_code=status.HTTP_200_OK)
+async def read_users(
+    response: Response,
+    order_by: Literal["id", "-id", "email", "-email"] = "id",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None),
+) -> Union[Page, Response]:
+    """
+    List users page by page, pass `next_cursor` back as `cursor` for the next page.
+    Answers 304 when none of the users on the page changed since the client's ETag.
+    """
+
+    page: Page = await crud_user.aget_page(
+        db=db, order_by=order_by, cursor=cursor, limit=limit
+    )
+    headers: dict[str, str] = {
+        "etag": collection_etag(page.items, page.next_cursor),
+        "cache-control": "private, no-cache",
+    }
+    if is_not_modified(if_none_match, headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return page
+
+
+@router.get(
+    "/export/", response_class=StreamingResponse, status_code=status.HTTP_200_OK
+)
+def export_users(fmt: Literal["ndjson", "csv"] = "ndjson") -> StreamingResponse:
+    """
+    Stream every user as NDJSON or CSV, memory use does not grow with the table.
+    """
+
+    return crud_user.export_response(schema=UserInDB, fmt=fmt)
+
+
+@router.post(
+    "/bulk/", response_model=List[UserInDB], status_code=status.HTTP_201_CREATED
+)
+async def create_users_bulk(
+    users_in: List[UserCreate] = Body(..., max_length=settings.bulk_max_items),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[UserInDB]:
+    """
+    Create many users at once, passwords are hashed in parallel. Nothing is
+    created when any of the emails is already taken.
+    """
+
+    return await crud_user.abulk_create(db=db, objs_in=users_in)
@@ -1,16 +1,16 @@
-import os
-from typing import Generator, Union
+from typing import Any, AsyncGenerator, Generator, Union
 from core.auth import oauth2_bearer
-from db.session import SessionLocal
-from dotenv import load_dotenv
+from core.revocation import revocation_list
+from core.tokens import decode_token
+from crud.crud_user import crud_user
+from db.routing import read_your_writes
+from db.session import AsyncSessionLocal, SessionLocal
 from fastapi import Depends, Response
-from jose import jwt, JWTError
+from jwt import PyJWTError
 from models.user import User
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.exceptions import get_user_exception
-
-load_dotenv()
+from core.exceptions import get_user_exception, user_must_be_admin
 
 
 def get_db() -> Generator:
@@ -21,18 +21,42 @@ def get_db() -> Generator:
         db.close()
 
 
-async def get_current_user(
-    response: Response, token: str = Depends(oauth2_bearer), db: Session = Depends(get_db)
-) -> Union[User, Exception]:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_token_payload(
+    token: str = Depends(oauth2_bearer),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, Any]:
     try:
-        payload = jwt.decode(token, os.getenv("TOKEN"), algorithms=[os.getenv("ALGORYTM")])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise get_user_exception()
-    except JWTError:
+        payload = decode_token(token)
+    except PyJWTError:
+        raise get_user_exception()
+    if payload.get("sub") is None:
         raise get_user_exception()
+    if await revocation_list.is_revoked(db, payload.get("jti")):
+        raise get_user_exception()
+    # Pins this subject's reads to the primary right after its own writes
+    if (state := read_your_writes.get()) is not None:
+        state.subject = str(payload["sub"])
+    return payload
+
 
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_current_user(
+    response: Response,
+    payload: dict[str, Any] = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_async_db),
+) -> Union[User, Exception]:
+    user_id: int = payload["sub"]
+    user = await crud_user.aget_cached(db=db, id=int(user_id))
     if user is None:
         raise get_user_exception()
     return user
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
+        raise user_must_be_admin()
+    return current_user
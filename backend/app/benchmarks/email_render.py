@@ -0,0 +1,69 @@
+"""
+Per-message cost of rendering email templates.
+
+Usage (from the app directory):
+    python -m benchmarks.email_render --recipients 5000
+
+Compares rendering the whole template for every message, as fastapi-mail
+did, with rendering the cached shell once and only the recipient block for
+each message.
+"""
+
+import argparse
+import time
+
+from jinja2 import DictLoader, Environment, select_autoescape
+
+from core.email import EmailTemplates
+
+LAYOUT: str = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>{{ title }}</title></head>
+<body>
+{% for section in sections %}<section><h2>{{ section.title }}</h2>
+<p>{{ section.text }}</p></section>
+{% endfor %}
+{% block recipient %}<p>Hello {{ name }}, your code is {{ code }}.</p>{% endblock %}
+<footer>{% for link in links %}<a href="{{ link }}">{{ link }}</a> {% endfor %}</footer>
+</body>
+</html>"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipients", type=int, default=5000)
+    args = parser.parse_args()
+
+    env = Environment(
+        loader=DictLoader({"campaign.html": LAYOUT}),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+    shared: dict = {
+        "title": "Newsletter",
+        "sections": [
+            {"title": f"Section {i}", "text": "Lorem " * 40} for i in range(20)
+        ],
+        "links": [f"https://example.com/{i}" for i in range(10)],
+    }
+    recipients: list[dict] = [
+        {"name": f"user{i}", "code": f"{i:06d}"} for i in range(args.recipients)
+    ]
+
+    started: float = time.perf_counter()
+    for recipient in recipients:
+        env.get_template("campaign.html").render(**shared, **recipient)
+    full_us: float = (time.perf_counter() - started) / len(recipients) * 1e6
+
+    templates = EmailTemplates(env)
+    templates.precompile()
+    started = time.perf_counter()
+    templates.render_many("campaign.html", shared, recipients)
+    cached_us: float = (time.perf_counter() - started) / len(recipients) * 1e6
+
+    print(f"full render:   {full_us:8.1f} us/message")
+    print(f"cached shell:  {cached_us:8.1f} us/message  ({full_us / cached_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Import time budget check for cold starts and worker respawns.
+
+Usage (from the app directory):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget main=1500 --budget core.auth=600
+
+Imports every module in a fresh interpreter with `-X importtime`, prints its
+total import time and slowest dependencies, and exits non-zero when a module
+is over budget or pulls in a dependency that must be imported lazily.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# main is the API cold start, core.auth is what a hashing pool worker imports
+DEFAULT_BUDGETS_MS: dict[str, float] = {"main": 1500.0, "core.auth": 800.0}
+# Only the code paths handling images may import these
+LAZY_MODULES: tuple[str, ...] = ("PIL", "boto3", "botocore", "pdf2image")
+
+
+def import_profile(module: str) -> list[tuple[str, int, int]]:
+    """(name, self us, cumulative us) of every module imported by `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    rows: list[tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="MODULE=MS",
+        help="import time budget of a module, replaces the defaults",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    budgets: dict[str, float] = {
+        module: float(ms)
+        for module, ms in (budget.split("=") for budget in args.budget)
+    } or DEFAULT_BUDGETS_MS
+
+    failed: bool = False
+    for module, budget_ms in budgets.items():
+        rows = import_profile(module)
+        total_ms: float = sum(self_us for _, self_us, _ in rows) / 1000
+        eager: list[str] = sorted(
+            {name for name, _, _ in rows if name.split(".")[0] in LAZY_MODULES}
+        )
+        over: bool = total_ms > budget_ms
+        failed |= over or bool(eager)
+
+        print(f"{module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+        for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[: args.top]:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+        if over:
+            print("  OVER BUDGET")
+        if eager:
+            print(f"  imports lazy dependencies eagerly: {', '.join(eager)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
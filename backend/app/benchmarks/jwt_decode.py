@@ -0,0 +1,93 @@
+"""
+Cost of verifying an access token per request.
+
+Usage (from the app directory):
+    python -m benchmarks.jwt_decode --iterations 20000
+
+"before" is the previous path: key and algorithm read from the environment
+(or a PEM key parsed) on every call. "preloaded" verifies with the key
+objects from TokenSettings, "cached" goes through decode_token and the
+verified token cache.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    PublicFormat,
+)
+
+from core import tokens
+from core.tokens import TokenSettings, decode_token
+
+
+def settings_for(algorithm: str) -> TokenSettings:
+    if algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        return TokenSettings(algorithm, "benchmark-secret", "benchmark-secret")
+    return TokenSettings(algorithm, private_key, private_key.public_key())
+
+
+def per_call_us(fn: Callable[[], object], iterations: int) -> float:
+    started: float = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    now: datetime = datetime.now(timezone.utc)
+    payload: dict = {"type": "access_token", "sub": "1", "iat": now}
+    payload["exp"] = now + timedelta(days=7)
+
+    print(f"{'algorithm':<10}{'before':>12}{'preloaded':>12}{'cached':>12}  us/decode")
+    for algorithm in ("HS256", "ES256", "EdDSA"):
+        settings: TokenSettings = settings_for(algorithm)
+        token: str = jwt.encode(payload, settings.signing_key, algorithm=algorithm)
+
+        if isinstance(settings.verification_key, str):
+            os.environ["TOKEN"] = settings.verification_key
+            os.environ["ALGORYTM"] = algorithm
+
+            def before() -> dict:
+                return jwt.decode(
+                    token, os.getenv("TOKEN"), algorithms=[os.getenv("ALGORYTM")]
+                )
+
+        else:
+            pem: bytes = settings.verification_key.public_bytes(
+                Encoding.PEM, PublicFormat.SubjectPublicKeyInfo
+            )
+
+            def before() -> dict:
+                return jwt.decode(token, pem, algorithms=[algorithm])
+
+        def preloaded() -> dict:
+            return jwt.decode(
+                token, settings.verification_key, algorithms=[settings.algorithm]
+            )
+
+        tokens.token_settings = settings
+        tokens.verified_tokens.clear()
+        results: list[float] = [
+            per_call_us(fn, args.iterations)
+            for fn in (before, preloaded, lambda: decode_token(token))
+        ]
+        print(f"{algorithm:<10}" + "".join(f"{value:>12.1f}" for value in results))
+
+
+if __name__ == "__main__":
+    main()
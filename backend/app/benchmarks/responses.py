@@ -0,0 +1,96 @@
+"""
+Requests per second per core of a user response, before and after the fast path.
+
+Usage (from the app directory):
+    python -m benchmarks.responses --requests 20000
+
+"before" is the original endpoint: a sync function, run in the threadpool,
+returning the ORM object through `response_model=UserInDB` with the stdlib
+JSON response. "after" is an async endpoint using the app's ORJSONResponse
+default and the precompiled `user_serializer`. Both apps are called in-process over ASGI on
+a single core, so only framework and serialization cost is measured.
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from schemas.user import UserInDB, user_serializer
+
+USER = SimpleNamespace(
+    id=1,
+    first_name="Ada",
+    surname="Lovelace",
+    email="ada@example.com",
+    is_admin=False,
+    hashed_password="not serialized",
+)
+
+
+def build_apps() -> dict[str, FastAPI]:
+    before = FastAPI(default_response_class=JSONResponse)
+    after = FastAPI(default_response_class=ORJSONResponse)
+
+    @before.get("/me/", response_model=UserInDB)
+    def read_before() -> UserInDB:
+        return USER
+
+    @after.get("/me/", response_model=UserInDB)
+    async def read_after() -> Response:
+        return user_serializer.response(USER)
+
+    return {"before": before, "after": after}
+
+
+async def requests_per_second(app: FastAPI, requests: int) -> float:
+    scope: dict = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/me/",
+        "raw_path": b"/me/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    started: float = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return requests / (time.perf_counter() - started)
+
+
+async def run(requests: int) -> None:
+    results: dict[str, float] = {}
+    for name, app in build_apps().items():
+        # Warm up routing and serializer caches before timing
+        await requests_per_second(app, min(requests, 500))
+        results[name] = await requests_per_second(app, requests)
+        print(f"{name:<7}{results[name]:>10.0f} req/s")
+    print(f"speedup{results['after'] / results['before']:>10.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
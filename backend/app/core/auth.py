@@ -1,20 +1,42 @@
-import os
+import time
+import uuid
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
 from typing import Optional
 
-from dotenv import load_dotenv
+from fastapi import BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 from models.user import User
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from passlib.hash import bcrypt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
 
-load_dotenv()
+from core.cache import user_cache
+from core.config import settings
+from core.tokens import encode_token
+from db.session import AsyncSessionLocal
+from core.workers import hashing_pool
 
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def rounds_policy(rounds: int) -> dict[str, int]:
+    """
+    Pin default, min and max rounds so hashes made with any other cost are
+    reported by `needs_update` and get rehashed on the next login. Every
+    worker must use the same cost, measured once with `python -m core.calibrate`
+    and shared through BCRYPT_ROUNDS, or they rehash each other's passwords.
+    """
+    return {
+        "bcrypt__default_rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+        "bcrypt__max_rounds": rounds,
+    }
+
+
+bcrypt_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", **rounds_policy(settings.bcrypt_rounds)
+)
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="api/auth/login/")
 
 
@@ -26,12 +48,67 @@ def verify_password(plain_pass, hashed_pass) -> bool:
     return bcrypt_context.verify(plain_pass, hashed_pass)
 
 
-def authenticate(email: str, password: str, db: Session) -> Optional[User]:
-    user = db.query(User).filter(func.lower(User.email) == func.lower(email)).first()
+async def aget_password_hash(password) -> str:
+    return await hashing_pool.run(get_password_hash, password)
+
+
+async def averify_password(plain_pass, hashed_pass) -> bool:
+    return await hashing_pool.run(verify_password, plain_pass, hashed_pass)
+
+
+def calibrate_bcrypt_rounds(
+    budget_ms: float, min_rounds: int = 10, max_rounds: int = 16
+) -> int:
+    """
+    Return the highest bcrypt cost whose hash time on this machine fits the
+    per-login latency budget, never going below `min_rounds`.
+    """
+    rounds: int = min_rounds
+    for candidate in range(min_rounds, max_rounds + 1):
+        started: float = time.perf_counter()
+        bcrypt.using(rounds=candidate).hash("calibration-password")
+        if (time.perf_counter() - started) * 1000 > budget_ms:
+            break
+        rounds = candidate
+    return rounds
+
+
+async def rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """
+    Store a hash made with the current policy for a user that just logged in,
+    unless the password was changed in the meantime. A Core UPDATE skips the
+    ORM version counter, so the version is bumped here.
+    """
+    hashed_password: str = await aget_password_hash(password)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=hashed_password, version=User.version + 1)
+        )
+        await db.commit()
+    user_cache.delete(user_id)
+
+
+async def authenticate(
+    email: str,
+    password: str,
+    db: AsyncSession,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Optional[User]:
+    user = await db.scalar(
+        select(User).where(func.lower(User.email) == func.lower(email))
+    )
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await averify_password(password, user.hashed_password):
         return None
+    if background_tasks is not None and bcrypt_context.needs_update(
+        user.hashed_password
+    ):
+        background_tasks.add_task(
+            rehash_password, user.id, password, user.hashed_password
+        )
     return user
 
 
@@ -41,15 +118,14 @@ def create_token(
     lifetime: Optional[timedelta] = None,
 ) -> str:
     payload = {}
-    if lifetime:
-        expire = datetime.now() + lifetime
-    else:
-        expire = datetime.now() + timedelta(days=7)
+    now: datetime = datetime.now(timezone.utc)
     payload["type"] = token_type
-    payload["exp"] = expire
-    payload["iat"] = datetime.now()
+    payload["exp"] = now + (lifetime or timedelta(days=7))
+    payload["iat"] = now
     payload["sub"] = str(sub)
-    return jwt.encode(payload, os.getenv("TOKEN"), algorithm=os.getenv("ALGORYTM"))
+    # Unique token id, lets a single token be revoked on logout
+    payload["jti"] = uuid.uuid4().hex
+    return encode_token(payload)
 
 
 def create_access_token(*, sub: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable, Optional
+
+from core.config import settings
+
+
+class CacheBackend(ABC):
+    """Interface every cache backend (in-process, shared) has to implement."""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]: ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]: ...
+
+
+class TTLCache(CacheBackend):
+    """Bounded in-process cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class DiskLRUCache:
+    """
+    Size bounded file cache, shared by every worker that uses the directory.
+    The least recently served files are removed once `max_bytes` is
+    exceeded. File modification times are the recency clock, so all state
+    lives in the directory and survives restarts.
+
+    Nothing touches the disk until first use. The directory is scanned then
+    and again only when the running byte total goes over budget; the total
+    only counts this process's writes in between, so eviction goes down to
+    `low_water` to leave every worker some headroom.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, grace_seconds: float = 60):
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        # Files served this recently may still be streaming to a client
+        self.grace_seconds: float = grace_seconds
+        self._lock: threading.Lock = threading.Lock()
+        self._evicting: threading.Lock = threading.Lock()
+        self.files: int = 0
+        self.total_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.low_water: int = int(max_bytes * 0.9)
+        self.scanned: bool = False
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of the cached file, or None."""
+        path: str = self.path(key)
+        try:
+            # Marks the file as recently used for every worker
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def set(self, key: str, data: bytes) -> str:
+        """Store the data and return its path, evicting old files if needed."""
+        if not self.scanned:
+            os.makedirs(self.directory, exist_ok=True)
+            self.evict()
+        path: str = self.path(key)
+        temp_path: str = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        try:
+            replaced: int = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = -1
+        os.replace(temp_path, path)
+        with self._lock:
+            self.files += replaced < 0
+            self.total_bytes += len(data) - max(replaced, 0)
+            over_budget: bool = self.total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the directory fits."""
+        # One scan per process at a time is enough
+        if not self._evicting.acquire(blocking=False):
+            return
+        try:
+            now: float = time.time()
+            entries: list[tuple[float, int, str]] = []
+            for entry in os.scandir(self.directory):
+                try:
+                    stat_result: os.stat_result = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    # Left behind by a worker that died while writing it
+                    if stat_result.st_mtime < now - self.grace_seconds:
+                        self.remove(entry.path)
+                    continue
+                entries.append((stat_result.st_mtime, stat_result.st_size, entry.path))
+
+            total_bytes: int = sum(size for _, size, _ in entries)
+            evictions: int = 0
+            target: int = (
+                self.low_water if total_bytes > self.max_bytes else self.max_bytes
+            )
+            for mtime, size, path in sorted(entries):
+                if total_bytes <= target or mtime > now - self.grace_seconds:
+                    break
+                self.remove(path)
+                total_bytes -= size
+                evictions += 1
+            with self._lock:
+                self.files = len(entries) - evictions
+                self.total_bytes = total_bytes
+                self.evictions += evictions
+            self.scanned = True
+        finally:
+            self._evicting.release()
+
+    @staticmethod
+    def remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker got to it first
+            pass
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "files": self.files,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+user_cache: CacheBackend = TTLCache(
+    maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl
+)
+
+
+@lru_cache(maxsize=None)
+def get_image_cache() -> DiskLRUCache:
+    """Rendered image cache, built on first use instead of at import."""
+    return DiskLRUCache(
+        directory=settings.image_cache_dir, max_bytes=settings.image_cache_max_bytes
+    )
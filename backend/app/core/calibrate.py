@@ -0,0 +1,36 @@
+"""
+Pick the bcrypt cost for this host from a per-login latency budget.
+
+Usage (from the app directory):
+    python -m core.calibrate --budget-ms 250
+
+Put the printed value into the .env file as BCRYPT_ROUNDS. Existing hashes
+made with another cost are rehashed transparently on the next login.
+"""
+
+import argparse
+import time
+
+from passlib.hash import bcrypt
+
+from core.auth import calibrate_bcrypt_rounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    rounds: int = calibrate_bcrypt_rounds(
+        budget_ms=args.budget_ms, min_rounds=args.min_rounds, max_rounds=args.max_rounds
+    )
+    started: float = time.perf_counter()
+    bcrypt.using(rounds=rounds).hash("calibration-password")
+    elapsed_ms: float = (time.perf_counter() - started) * 1000
+    print(f"BCRYPT_ROUNDS={rounds}  # ~{elapsed_ms:.0f} ms per hash")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import typing
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+
+def env(name: str, **kwargs: Any) -> Any:
+    """Field read from an environment variable not named after it."""
+    return field(metadata={"env": name}, **kwargs)
+
+
+def secret(name: Optional[str] = None) -> Any:
+    """Field kept out of the repr, so settings can be logged."""
+    metadata: dict = {"env": name} if name else {}
+    return field(default=None, repr=False, metadata=metadata)
+
+
+def parse(raw: str, annotation: Any) -> Any:
+    """Convert an environment value to the field's annotated type."""
+    if typing.get_origin(annotation) is typing.Union:
+        annotation = next(a for a in typing.get_args(annotation) if a is not type(None))
+    if typing.get_origin(annotation) is tuple:
+        item_type = typing.get_args(annotation)[0]
+        return tuple(parse(item.strip(), item_type) for item in raw.split(",") if item)
+    if annotation is bool:
+        return raw.lower() == "true"
+    return annotation(raw)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Every setting of the app, read once from the environment (and .env).
+    A field is read from its upper-cased name unless it says otherwise.
+    """
+
+    # Database
+    database_url: Optional[str] = None
+    async_database_url: Optional[str] = None
+    database_replica_urls: tuple[str, ...] = ()
+    # Alembic manages the schema, the container runs `alembic upgrade head`
+    # before starting. create_all on startup is only for throwaway databases,
+    # it never alters existing tables
+    db_create_all: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0
+    # Connections go through pgbouncer in transaction mode, pooling is left to it
+    db_pgbouncer: bool = False
+    db_replica_sticky_seconds: float = 5
+    # Signs the primary pin cookie, TOKEN is used when unset
+    db_replica_sticky_secret: Optional[str] = secret()
+    db_replica_max_lag_seconds: float = 10
+    db_replica_check_interval: float = 5
+    # Upper bound on the objects a single bulk request may create
+    bulk_max_items: int = 1000
+
+    # Tokens and passwords
+    token_algorithm: str = env("ALGORYTM", default="HS256")
+    token_secret: Optional[str] = secret("TOKEN")
+    token_private_key: Optional[str] = secret()
+    token_private_key_file: Optional[str] = None
+    token_public_key: Optional[str] = None
+    token_public_key_file: Optional[str] = None
+    token_cache_size: int = 10000
+    # Upper bound on how long a verified token is trusted without checking the signature
+    token_cache_ttl: float = 300
+    bcrypt_rounds: int = 12
+    revocation_bloom_capacity: int = 100000
+    revocation_bloom_error_rate: float = 0.001
+    # Revocations made by other processes are picked up within this many seconds
+    revocation_refresh_interval: float = 5
+    # Each refresh rescans revocations this many seconds older than the newest
+    # one seen, so rows that committed late are not skipped
+    revocation_refresh_overlap: float = 60
+    revocation_prune_interval: float = 3600
+
+    # Caches and worker pools
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60
+    image_cache_dir: str = "cache/images"
+    image_cache_max_bytes: int = 512 * 1024 * 1024
+    hash_pool_workers: Optional[int] = None
+    hash_pool_max_queue: int = 64
+    image_pool_workers: Optional[int] = None
+    image_pool_max_queue: int = 16
+
+    # Images and storage
+    backend_url: Optional[str] = None
+    cdn_url: Optional[str] = None
+    origin_cdn_url: Optional[str] = None
+    do_spaces_region: Optional[str] = None
+    do_spaces_bucket: Optional[str] = None
+    do_spaces_access_key: Optional[str] = secret()
+    do_spaces_secret_key: Optional[str] = secret()
+    image_max_pixels: int = 50_000_000
+    image_variant_widths: tuple[int, ...] = (320, 640, 1280)
+    image_variant_formats: tuple[str, ...] = ("webp", "avif")
+    upload_max_bytes: int = 100 * 1024 * 1024
+    upload_part_size: int = 8 * 1024 * 1024
+    upload_max_concurrency: int = 4
+    # A pending upload claimed longer ago than this is taken over by the next
+    # caller waiting for the same content, it has to outlast the slowest upload
+    upload_claim_timeout: float = 600
+    upload_wait_interval: float = 0.5
+    pdf_dpi: int = 200
+    pdf_max_pages: int = 100
+    s3_max_pool_connections: int = 50
+    s3_max_attempts: int = 3
+    s3_connect_timeout: float = 5
+    s3_read_timeout: float = 60
+
+    # Media files served from /media
+    media_dir: str = "media"
+    # Cache lifetime of media files whose names carry no content hash
+    media_max_age: int = 0
+    media_compress_min_bytes: int = 1024
+    media_compress_max_bytes: int = 10 * 1024 * 1024
+    media_memory_cache_entries: int = 512
+    media_memory_cache_max_file: int = 64 * 1024
+    media_sendfile_min_bytes: int = 1024 * 1024
+
+    # Email
+    mail_server: Optional[str] = None
+    mail_port: int = 25
+    mail_username: Optional[str] = None
+    mail_password: Optional[str] = secret()
+    mail_from: Optional[str] = None
+    mail_from_name: Optional[str] = None
+    # Each process runs its own delivery worker, the rate the server sees is
+    # this times the number of workers
+    mail_worker_rate_per_second: float = 10
+    mail_batch_size: int = 50
+    mail_max_retries: int = 3
+    # Retries back off exponentially from this many seconds
+    mail_retry_base_delay: float = 1
+    mail_queue_size: int = 10000
+    # The SMTP session is closed after this many idle seconds and reopened on demand
+    mail_idle_timeout: float = 30
+    email_template_dir: str = "./templates/email/"
+    email_shell_cache_size: int = 128
+    email_shell_cache_ttl: float = 3600
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_dotenv()
+        values: dict[str, Any] = {}
+        for setting in fields(cls):
+            raw: Optional[str] = os.getenv(
+                setting.metadata.get("env", setting.name.upper())
+            )
+            # Empty variables count as unset
+            if raw:
+                values[setting.name] = parse(raw, setting.type)
+        return cls(**values)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    return Settings.from_env()
+
+
+settings: Settings = get_settings()
@@ -1,51 +1,338 @@
-import os
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
-from fastapi import BackgroundTasks
-from dotenv import load_dotenv
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Any, Optional
 
-load_dotenv()
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+from core.cache import TTLCache
+from core.config import settings
+from core.exceptions import service_unavailable
+
+logger = logging.getLogger(__name__)
+
+# Name of the block holding the per-recipient part of a template
+RECIPIENT_BLOCK: str = "recipient"
+RECIPIENT_SLOT: str = "\x00recipient\x00"
+
+
+class EmailTemplates:
+    """
+    Jinja templates compiled once. When a template defines a `recipient` block,
+    the static shell around it is rendered once per shared context and cached,
+    only the block is rendered for each recipient.
+    """
+
+    def __init__(self, env: Environment):
+        self.env: Environment = env
+        self.templates: dict[str, Template] = {}
+        self.shells: TTLCache = TTLCache(
+            maxsize=settings.email_shell_cache_size, ttl=settings.email_shell_cache_ttl
+        )
+
+    def precompile(self) -> int:
+        """Compile every template up front so no message pays for it."""
+        for name in self.env.list_templates(extensions=["html", "txt"]):
+            self.templates[name] = self.env.get_template(name)
+        return len(self.templates)
+
+    def get(self, name: str) -> Template:
+        if (template := self.templates.get(name)) is None:
+            template = self.templates[name] = self.env.get_template(name)
+        return template
+
+    def shell(self, name: str, shared: dict) -> Optional[tuple[str, str, dict]]:
+        """
+        Markup before and after the recipient block along with the variables
+        the template sets at top level, None if there is no such block.
+        Top-level statements only see the shared context.
+        """
+        template: Template = self.get(name)
+        if RECIPIENT_BLOCK not in template.blocks:
+            return None
+        key: tuple[str, str] = (name, json.dumps(shared, sort_keys=True, default=str))
+        if (cached := self.shells.get(key)) is not None:
+            return cached
+        context = template.new_context(shared)
+        context.blocks[RECIPIENT_BLOCK] = [lambda _: iter((RECIPIENT_SLOT,))]
+        html: str = self.env.concat(template.root_render_func(context))
+        head, _, tail = html.partition(RECIPIENT_SLOT)
+        # A full render would run the block with these already assigned
+        self.shells.set(key, (head, tail, dict(context.vars)))
+        return head, tail, dict(context.vars)
+
+    def render_many(self, name: str, shared: dict, recipients: list[dict]) -> list[str]:
+        """Render one body per recipient context, sharing a single shell."""
+        template: Template = self.get(name)
+        shell: Optional[tuple[str, str, dict]] = self.shell(name, shared)
+        if shell is None:
+            return [template.render(**shared, **recipient) for recipient in recipients]
+        head, tail, assigned = shell
+        block = template.blocks[RECIPIENT_BLOCK]
+        return [
+            head
+            + self.env.concat(
+                block(template.new_context({**shared, **recipient}, locals=assigned))
+            )
+            + tail
+            for recipient in recipients
+        ]
+
+    def render(self, name: str, shared: dict, recipient: Optional[dict] = None) -> str:
+        return self.render_many(name, shared, [recipient or {}])[0]
+
+
+email_templates = EmailTemplates(
+    Environment(
+        loader=FileSystemLoader(settings.email_template_dir),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+)
+
+
+@dataclass
+class QueuedEmail:
+    message: EmailMessage
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether the server refused the message for good (5xx), retrying won't help."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and error.code >= 500
+
+
+class EmailDeliveryWorker:
+    """
+    Process wide delivery queue. A single task keeps one SMTP session open,
+    sends queued messages over it in batches at no more than
+    `MAIL_WORKER_RATE_PER_SECOND` and retries temporary failures with
+    exponential backoff. Retries wait on timers, never in the sending task.
+    The rate limit is per process, every worker process sends at that rate.
+    """
+
+    def __init__(self):
+        self.hostname: Optional[str] = settings.mail_server
+        self.port: int = settings.mail_port
+        self.username: Optional[str] = settings.mail_username
+        self.password: Optional[str] = settings.mail_password
+        self.queue: asyncio.Queue[QueuedEmail] = asyncio.Queue(
+            maxsize=settings.mail_queue_size
+        )
+        self.smtp: Optional[aiosmtplib.SMTP] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_send: float = 0.0
+        self._retry_timers: set[asyncio.TimerHandle] = set()
+        self.sent: int = 0
+        self.failed: int = 0
+        self.retries: int = 0
+        self.dropped: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued messages a chance to go out, then close the session."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.queue.qsize()} undelivered emails")
+        if self._retry_timers:
+            logger.warning(f"Dropping {len(self._retry_timers)} emails awaiting retry")
+            self.dropped += len(self._retry_timers)
+            for timer in self._retry_timers:
+                timer.cancel()
+            self._retry_timers.clear()
+        self._task.cancel()
+        self._task = None
+        await self.disconnect()
+
+    def enqueue(self, message: EmailMessage) -> None:
+        try:
+            self.queue.put_nowait(QueuedEmail(message=message))
+        except asyncio.QueueFull:
+            raise service_unavailable(detail="Email queue is full, please retry.")
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        if self.smtp is None or not self.smtp.is_connected:
+            self.smtp = aiosmtplib.SMTP(
+                hostname=self.hostname,
+                port=self.port,
+                use_tls=False,
+                start_tls=False,
+                validate_certs=True,
+            )
+            await self.smtp.connect()
+            if self.username:
+                await self.smtp.login(self.username, self.password)
+        return self.smtp
+
+    async def disconnect(self) -> None:
+        if self.smtp is not None and self.smtp.is_connected:
+            try:
+                await self.smtp.quit()
+            except aiosmtplib.SMTPException:
+                self.smtp.close()
+        self.smtp = None
+
+    async def throttle(self) -> None:
+        """Space sends evenly so the configured rate is never exceeded."""
+        now: float = time.monotonic()
+        if self._next_send > now:
+            await asyncio.sleep(self._next_send - now)
+        self._next_send = (
+            max(now, self._next_send) + 1 / settings.mail_worker_rate_per_second
+        )
+
+    def retry_later(self, email: QueuedEmail, error: Exception) -> None:
+        """Schedule a temporary failure to be queued again after its backoff."""
+        email.attempts += 1
+        if is_permanent(error) or email.attempts > settings.mail_max_retries:
+            self.failed += 1
+            logger.error(f"Giving up on email to {email.message['To']}: {error}")
+            return
+        self.retries += 1
+        delay: float = settings.mail_retry_base_delay * 2 ** (email.attempts - 1)
+        timer: asyncio.TimerHandle = asyncio.get_running_loop().call_later(
+            delay, lambda: self.requeue(email, timer)
+        )
+        self._retry_timers.add(timer)
+
+    def requeue(self, email: QueuedEmail, timer: asyncio.TimerHandle) -> None:
+        self._retry_timers.discard(timer)
+        try:
+            self.queue.put_nowait(email)
+        except asyncio.QueueFull:
+            # Waiting for room here could block on the only consumer
+            self.dropped += 1
+            logger.error(
+                f"Queue full, dropping retry of email to {email.message['To']}"
+            )
+
+    async def send_batch(self, batch: list[QueuedEmail]) -> None:
+        """Send a batch over the open session, reconnecting after failures."""
+        for email in batch:
+            await self.throttle()
+            try:
+                smtp: aiosmtplib.SMTP = await self.connect()
+                await smtp.send_message(email.message)
+            except (aiosmtplib.SMTPException, OSError) as e:
+                # The session may be broken, the next message reconnects
+                await self.disconnect()
+                self.retry_later(email, e)
+                continue
+            latency: float = time.monotonic() - email.enqueued_at
+            self.sent += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                first: QueuedEmail = await asyncio.wait_for(
+                    self.queue.get(), settings.mail_idle_timeout
+                )
+            except asyncio.TimeoutError:
+                await self.disconnect()
+                continue
+
+            batch: list[QueuedEmail] = [first]
+            while len(batch) < settings.mail_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.send_batch(batch)
+            except Exception as e:
+                logger.error(f"Email delivery failed: {e}")
+                await self.disconnect()
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "connected": self.smtp is not None and self.smtp.is_connected,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "retry_pending": len(self._retry_timers),
+            "dropped": self.dropped,
+            "avg_latency_ms": (
+                round(self.total_latency / self.sent * 1000, 2) if self.sent else 0.0
+            ),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
+
+
+email_worker = EmailDeliveryWorker()
 
 
 class EmailService:
     def __init__(self):
-        self.conf: ConnectionConfig = ConnectionConfig(
-            MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-            MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-            MAIL_FROM=os.getenv("MAIL_FROM"),
-            MAIL_PORT=os.getenv("MAIL_PORT"),
-            MAIL_SERVER=os.getenv("MAIL_SERVER"),
-            MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME"),
-            MAIL_STARTTLS=False,
-            MAIL_SSL_TLS=False,
-            USE_CREDENTIALS=True,
-            VALIDATE_CERTS=True,
-            TEMPLATE_FOLDER="./templates/email/",
+        self.mail_from: Optional[str] = settings.mail_from
+        self.mail_from_name: Optional[str] = settings.mail_from_name
+
+    def build_message(
+        self, subject: str, recipients: list[str], html: str
+    ) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = (
+            f"{self.mail_from_name} <{self.mail_from}>"
+            if self.mail_from_name
+            else self.mail_from
         )
-        self.fast_mail: FastMail = FastMail(self.conf)
+        message["To"] = ", ".join(recipients)
+        message.set_content(html, subtype="html")
+        return message
 
     def send_email(
         self,
         subject: str,
         recipients: list[str],
         template_name: str,
-        background_tasks: BackgroundTasks,
         template_body: dict = None,
     ) -> True:
         """
-        Send an email using FastAPI Mail.
+        Queue an email for the delivery worker, delivery never runs in the
+        request's worker.
         """
-        message = MessageSchema(
-            subject=subject,
-            recipients=recipients,
-            template_body=template_body,
-            subtype="html",
-        )
-        background_tasks.add_task(
-            self.fast_mail.send_message, message, template_name=template_name
-        )
+        html: str = email_templates.render(template_name, template_body or {})
+        email_worker.enqueue(self.build_message(subject, recipients, html))
         return True
 
-    def send_test_email(self, email: str, background_tasks: BackgroundTasks) -> True:
+    def send_bulk(
+        self,
+        subject: str,
+        template_name: str,
+        recipients: dict[str, dict],
+        template_body: dict = None,
+    ) -> int:
+        """
+        Queue one personalised email per address. `recipients` maps each address
+        to the context of the template's `recipient` block, `template_body` is
+        shared by all of them and only rendered once.
+        """
+        bodies: list[str] = email_templates.render_many(
+            template_name, template_body or {}, list(recipients.values())
+        )
+        for email, html in zip(recipients, bodies):
+            email_worker.enqueue(self.build_message(subject, [email], html))
+        return len(bodies)
+
+    def send_test_email(self, email: str) -> True:
         """
         Send a test email to the specified recipient.
         """
@@ -53,5 +340,4 @@ class EmailService:
             subject="Test email",
             recipients=[email],
             template_name="blank.html",
-            background_tasks=background_tasks,
         )
@@ -50,3 +50,30 @@ def no_permission() -> HTTPException:
     )
 
     return permission_exception
+
+
+def service_unavailable(detail: str = "Server is busy, please retry.") -> HTTPException:
+    unavailable_exception: HTTPException = HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": "1"},
+    )
+    return unavailable_exception
+
+
+def file_too_large(detail: str = "File is too large.") -> HTTPException:
+    size_exception: HTTPException = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=detail,
+    )
+    return size_exception
+
+
+def precondition_failed(
+    detail: str = "The object was changed in the meantime, reload it and retry.",
+) -> HTTPException:
+    precondition_exception: HTTPException = HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=detail,
+    )
+    return precondition_exception
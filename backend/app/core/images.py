@@ -1,38 +1,278 @@
+import asyncio
+import hashlib
 import os
 import random
 import string
 import shutil
+import struct
+import zlib
+from contextlib import contextmanager
 from uuid import uuid4
 from io import BytesIO
-from fastapi import UploadFile
-from PIL import Image, ImageOps
-from pdf2image import convert_from_path
-from dotenv import load_dotenv
-import boto3
+from typing import TYPE_CHECKING, BinaryIO, Iterator
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 import logging
+from functools import lru_cache
 
-from core.exceptions import custom_exception
+from core.config import settings
+from core.exceptions import custom_exception, file_too_large
+from core.workers import image_pool
+from crud.crud_stored_file import crud_stored_file
+from db.session import AsyncSessionLocal, SessionLocal
+from models.stored_file import READY, StoredFile
+from schemas.stored_file import StoredFileCreate
+
+# Pillow, pdf2image and boto3 are imported where they are used, so processes
+# that never handle images do not pay for importing them
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+IMAGE_BASE_WIDTH: int = 800
+# EXIF tag telling how the stored pixels have to be turned to stand upright
+EXIF_ORIENTATION: int = 0x0112
+# delete_objects accepts at most this many keys per request
+S3_DELETE_BATCH_SIZE: int = 1000
+
+IMAGE_ENCODE_OPTIONS: dict[str, dict] = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60},
+}
+
+
+@lru_cache(maxsize=None)
+def image_variant_formats() -> tuple[str, ...]:
+    """Configured variant formats, AVIF only when this Pillow build can encode it."""
+    from PIL import Image
+
+    Image.init()
+    return tuple(
+        fmt for fmt in settings.image_variant_formats if fmt.upper() in Image.SAVE
+    )
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class LimitedReader:
+    """
+    Read-only, non-seekable view of a file that fails once more than
+    `max_bytes` were read, so the limit holds while the upload is streaming.
+    """
+
+    def __init__(self, fileobj: BinaryIO, max_bytes: int):
+        self.fileobj: BinaryIO = fileobj
+        self.max_bytes: int = max_bytes
+        self.bytes_read: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk: bytes = self.fileobj.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {self.max_bytes} bytes")
+        return chunk
+
+
+def open_image(content: bytes, target_width: int, max_pixels: int) -> "Image.Image":
+    """
+    Open an image for scaling to at most `target_width`, rejecting oversized
+    inputs from the header before any pixel is decoded. The image comes back
+    turned upright by its EXIF orientation.
+    """
+    from PIL import Image, ImageOps
+
+    # Pillow raises DecompressionBombError past this, the explicit check below
+    # fails earlier and with a clearer error
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        img = Image.open(BytesIO(content))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    if img.size[0] * img.size[1] > max_pixels:
+        raise ImageTooLarge(f"Image has more than {max_pixels} pixels")
+    # JPEG: let the decoder downscale by a power of two before decoding fully.
+    # Orientations 5 to 8 are stored sideways, the target width is a height
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+        img.draft("RGB", (int(width * target_width / height), target_width))
+    else:
+        img.draft("RGB", (target_width, int(height * target_width / width)))
+    return ImageOps.exif_transpose(img)
+
+
+def scale_image(img: "Image.Image", width: int) -> "Image.Image":
+    from PIL import Image
+
+    height = int((float(img.size[1]) * float(width / float(img.size[0]))))
+    # reducing_gap shrinks with the cheap reduce() first, LANCZOS does the rest
+    return img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def encode_image(img: "Image.Image", fmt: str) -> bytes:
+    buffer = BytesIO()
+    if fmt == "png":
+        img.save(buffer, format="PNG")
+    else:
+        img.save(buffer, format=fmt.upper(), **IMAGE_ENCODE_OPTIONS.get(fmt, {}))
+    return buffer.getvalue()
+
+
+def resize_image(
+    content: bytes,
+    base_width: int = IMAGE_BASE_WIDTH,
+    max_pixels: int = settings.image_max_pixels,
+    variant_widths: tuple[int, ...] = (),
+    variant_formats: tuple[str, ...] = (),
+) -> tuple[bytes, int, int, list[tuple[int, str, bytes]]]:
+    """
+    Scale an image to `base_width` and re-encode it as PNG, returns the PNG
+    with its final width and height. The responsive variants (every width in
+    every format, never upscaled) come from the same decode. Runs in the
+    image worker pool, so it must stay a picklable module level function.
+    """
+    img = open_image(content, max((base_width, *variant_widths)), max_pixels)
+
+    main = scale_image(img, base_width)
+
+    variants: list[tuple[int, str, bytes]] = []
+    oriented = img
+    for width in sorted(variant_widths, reverse=True):
+        # The draft can match a width exactly, only larger widths are skipped
+        if width > oriented.size[0]:
+            continue
+        # Each size is scaled from the previous, larger one
+        oriented = scale_image(oriented, width)
+        variants.extend(
+            (width, fmt, encode_image(oriented, fmt)) for fmt in variant_formats
+        )
+
+    return encode_image(main, "png"), main.size[0], main.size[1], variants
+
+
+def render_width(
+    content: bytes, width: int, fmt: str, max_pixels: int = settings.image_max_pixels
+) -> bytes:
+    """Scale an original to `width` (never up) and encode it, for on-demand sizes."""
+    img = open_image(content, width, max_pixels)
+    if width < img.size[0]:
+        img = scale_image(img, width)
+    return encode_image(img, fmt)
+
+
+class PNGStripWriter:
+    """
+    Writes an RGB PNG of known size strip by strip, so a tall image never has
+    to exist in memory as a whole.
+    """
+
+    def __init__(self, fileobj: BinaryIO, width: int, height: int, level: int = 6):
+        self.fileobj: BinaryIO = fileobj
+        self.width: int = width
+        self.compressor = zlib.compressobj(level)
+        fileobj.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bit depth, colour type 2 (RGB), default compression/filter/interlace
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, tag: bytes, data: bytes) -> None:
+        self.fileobj.write(struct.pack(">I", len(data)) + tag + data)
+        self.fileobj.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    def write_strip(self, strip: "Image.Image") -> None:
+        raw: bytes = strip.convert("RGB").tobytes()
+        row_size: int = self.width * 3
+        # Every scanline starts with its filter type, 0 means unfiltered
+        scanlines: bytes = b"".join(
+            b"\x00" + raw[i : i + row_size] for i in range(0, len(raw), row_size)
+        )
+        if compressed := self.compressor.compress(scanlines):
+            self.write_chunk(b"IDAT", compressed)
+
+    def close(self) -> None:
+        self.write_chunk(b"IDAT", self.compressor.flush())
+        self.write_chunk(b"IEND", b"")
+
+
+def storage_client_options() -> dict:
+    from botocore.config import Config
+
+    return {
+        "region_name": settings.do_spaces_region,
+        "endpoint_url": settings.origin_cdn_url,
+        "aws_access_key_id": settings.do_spaces_access_key,
+        "aws_secret_access_key": settings.do_spaces_secret_key,
+        "config": Config(
+            max_pool_connections=settings.s3_max_pool_connections,
+            retries={"max_attempts": settings.s3_max_attempts, "mode": "standard"},
+            connect_timeout=settings.s3_connect_timeout,
+            read_timeout=settings.s3_read_timeout,
+        ),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_storage_client():
+    """
+    Process wide S3 client. Clients are thread safe and keep their own
+    connection pool, so building one per handler only costs time.
+    """
+    import boto3
+
+    return boto3.session.Session().client("s3", **storage_client_options())
+
+
+class AsyncStorageClient:
+    """
+    Process wide aiobotocore S3 client for use straight from the event loop,
+    created on first use and closed on shutdown.
+    """
+
+    def __init__(self):
+        self._context = None
+        self._client = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    from aiobotocore.session import get_session
+
+                    self._context = get_session().create_client(
+                        "s3", **storage_client_options()
+                    )
+                    self._client = await self._context.__aenter__()
+        return self._client
+
+    async def close(self) -> None:
+        if self._context is not None:
+            await self._context.__aexit__(None, None, None)
+            self._context = None
+            self._client = None
+
+
+async_storage_client = AsyncStorageClient()
 
 
 class ImageHandler:
     def __init__(self):
-        self.backend_url: str | None = os.getenv("BACKEND_URL")
-        self.cdn_url: str | None = os.getenv("CDN_URL")
-        self.origin_cdn_url: str | None = os.getenv("ORIGIN_CDN_URL")
-        self.bucket_name: str | None = os.getenv("DO_SPACES_BUCKET")
-        self.client = boto3.session.Session().client(
-            "s3",
-            region_name=os.getenv("DO_SPACES_REGION"),
-            endpoint_url=self.origin_cdn_url,
-            aws_access_key_id=os.getenv("DO_SPACES_ACCESS_KEY"),
-            aws_secret_access_key=os.getenv("DO_SPACES_SECRET_KEY"),
-        )
+        self.backend_url: str | None = settings.backend_url
+        self.cdn_url: str | None = settings.cdn_url
+        self.origin_cdn_url: str | None = settings.origin_cdn_url
+        self.bucket_name: str | None = settings.do_spaces_bucket
+
+    @property
+    def client(self):
+        # Resolved on use, so holding a handler does not import boto3
+        return get_storage_client()
 
     @staticmethod
     def is_image(filename: str) -> bool:
@@ -57,104 +297,582 @@ class ImageHandler:
         with open(path, "wb") as buffer:
             shutil.copyfileobj(upload_file.file, buffer)
 
-    def pdf_to_single_png(
-        self, upload_file: UploadFile, directory: str, file_name: str
-    ) -> str:
-        """Convert a PDF file to a single PNG image."""
-        os.makedirs(directory, exist_ok=True)
-        temp_pdf_path: str = os.path.join(directory, f"{uuid4().hex}.pdf")
+    @staticmethod
+    @contextmanager
+    def pdf_path(upload_file: UploadFile, directory: str) -> Iterator[str]:
+        """
+        Path poppler can open for the uploaded PDF. The spooled upload is
+        used directly through procfs, a temp copy is only written when that
+        is not available.
+        """
+        file = upload_file.file
+        proc_path: str = f"/proc/{os.getpid()}/fd"
+        if hasattr(file, "rollover") and os.path.isdir(proc_path):
+            file.rollover()
+            file.flush()
+            yield f"{proc_path}/{file.fileno()}"
+            return
 
+        temp_pdf_path: str = os.path.join(directory, f"{uuid4().hex}.pdf")
         with open(temp_pdf_path, "wb") as temp_pdf:
-            temp_pdf.write(upload_file.file.read())
+            shutil.copyfileobj(file, temp_pdf)
+        try:
+            yield temp_pdf_path
+        finally:
+            os.remove(temp_pdf_path)
 
-        pages: list[Image.Image] = convert_from_path(
-            temp_pdf_path, fmt="png", thread_count=4
-        )
+    @staticmethod
+    def pdf_page_count(pdf_path: str) -> int:
+        from pdf2image import pdfinfo_from_path
+
+        page_count: int = pdfinfo_from_path(pdf_path)["Pages"]
+        if page_count > settings.pdf_max_pages:
+            raise UploadTooLarge(f"PDF has more than {settings.pdf_max_pages} pages")
+        return page_count
+
+    @staticmethod
+    def render_pdf_page(
+        pdf_path: str, page_number: int, dpi: int = settings.pdf_dpi
+    ) -> "Image.Image":
+        """Render a single page, so only one page is in memory at a time."""
+        from pdf2image import convert_from_path
+
+        return convert_from_path(
+            pdf_path, dpi=dpi, fmt="png", first_page=page_number, last_page=page_number
+        )[0]
+
+    def pdf_to_single_png(
+        self,
+        upload_file: UploadFile,
+        directory: str,
+        file_name: str,
+        dpi: int = settings.pdf_dpi,
+    ) -> str:
+        """Convert a PDF file to a single PNG image with the pages stacked vertically."""
+        from PIL import Image
+
+        os.makedirs(directory, exist_ok=True)
         file_name: str = file_name.replace(".pdf", ".png")
         final_image_path: str = os.path.join(directory, file_name)
 
-        width, height = pages[0].size
-        combined_height: int = height * len(pages)
-        combined_image: Image.Image = Image.new("RGB", (width, combined_height))
-
-        for i, page in enumerate(pages):
-            combined_image.paste(page, (0, i * height))
+        try:
+            with self.pdf_path(upload_file, directory) as pdf_path:
+                page_count: int = self.pdf_page_count(pdf_path)
+                first_page: Image.Image = self.render_pdf_page(pdf_path, 1, dpi)
+                # Every page gets the first page's size, like pasting onto one canvas
+                width, height = first_page.size
 
-        combined_image: Image.Image | None = ImageOps.exif_transpose(combined_image)
-        combined_image.save(final_image_path, format="PNG", optimize=True)
-        os.remove(temp_pdf_path)
+                with open(final_image_path, "wb") as final_image:
+                    writer = PNGStripWriter(final_image, width, height * page_count)
+                    for page_number in range(1, page_count + 1):
+                        page: Image.Image = (
+                            first_page
+                            if page_number == 1
+                            else self.render_pdf_page(pdf_path, page_number, dpi)
+                        )
+                        strip: Image.Image = Image.new("RGB", (width, height))
+                        strip.paste(page, (0, 0))
+                        writer.write_strip(strip)
+                    writer.close()
+        except BaseException:
+            self.remove_local_files([final_image_path])
+            raise
 
         return final_image_path
 
-    def save_image(
+    def pdf_to_pngs(
+        self,
+        upload_file: UploadFile,
+        directory: str,
+        file_name: str,
+        dpi: int = settings.pdf_dpi,
+    ) -> list[str]:
+        """Convert a PDF file to one PNG image per page."""
+        os.makedirs(directory, exist_ok=True)
+        stem: str = file_name.replace(".pdf", "")
+        paths: list[str] = []
+
+        try:
+            with self.pdf_path(upload_file, directory) as pdf_path:
+                for page_number in range(1, self.pdf_page_count(pdf_path) + 1):
+                    path: str = os.path.join(directory, f"{stem}_{page_number}.png")
+                    # Tracked before saving, so a half written page is removed too
+                    paths.append(path)
+                    self.render_pdf_page(pdf_path, page_number, dpi).save(
+                        path, format="PNG"
+                    )
+        except BaseException:
+            self.remove_local_files(paths)
+            raise
+
+        return paths
+
+    @staticmethod
+    def remove_local_files(paths: list[str]) -> None:
+        """Remove temporary files, those already gone are skipped."""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def upload_fileobj(
+        self,
+        fileobj: BinaryIO,
+        object_name: str,
+        content_type: str,
+        max_bytes: int = settings.upload_max_bytes,
+    ) -> int:
+        """
+        Stream a file to the bucket part by part and return its size. Only
+        `part size * concurrency` bytes are buffered, small files still go up
+        in a single PUT.
+        """
+        from boto3.s3.transfer import TransferConfig
+
+        reader = LimitedReader(fileobj, max_bytes)
+        self.client.upload_fileobj(
+            reader,
+            self.bucket_name,
+            object_name,
+            ExtraArgs={"ACL": "public-read", "ContentType": content_type},
+            Config=TransferConfig(
+                multipart_threshold=settings.upload_part_size,
+                multipart_chunksize=settings.upload_part_size,
+                max_concurrency=settings.upload_max_concurrency,
+            ),
+        )
+        return reader.bytes_read
+
+    def upload_path(self, path: str, object_name: str, content_type: str) -> int:
+        """Stream a local file to the bucket, remove it and return its size."""
+        try:
+            with open(path, "rb") as file:
+                return self.upload_fileobj(file, object_name, content_type)
+        finally:
+            os.remove(path)
+
+    async def save_image(
         self,
         image: UploadFile | str,
         directory: str = "common",
         resize: bool = True,
         convert: bool = False,
-        random_count: int = 5,
     ) -> str:
-        """Save an image to a specified directory and return its URL."""
+        """
+        Save an image to a specified directory and return its URL. Uploads are
+        keyed by content hash, a repeated upload reuses the stored object. No
+        transaction is held while uploading: the row is committed as pending
+        and a concurrent upload of the same content polls until it is ready,
+        taking the upload over when the first one is given up.
+        """
         if not image:
             return ""
         if isinstance(image, str):
             return image
 
-        file_name: str = f"{self.get_random_string(random_count)}_{image.filename}"
-
-        if convert and ".pdf" in image.filename:
-            temp_directory = "temp"
-            os.makedirs(temp_directory, exist_ok=True)
-            local_path = self.pdf_to_single_png(image, temp_directory, file_name)
-            with open(local_path, "rb") as file:
-                image_content: bytes = file.read()
-            os.remove(local_path)
-            file_name: str = file_name.replace(".pdf", ".png")
-        else:
-            image_content = image.file.read()
-
-        if self.is_image(image.filename) and resize:
-            img = Image.open(BytesIO(image_content))
-            base_width = 800
-            wpercent = base_width / float(img.size[0])
-            hsize = int((float(img.size[1]) * float(wpercent)))
-            img = img.resize((base_width, hsize), Image.Resampling.LANCZOS)
-            img = ImageOps.exif_transpose(img)
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            image_content = buffer.getvalue()
-
-        object_name: str = f"{directory}/{file_name}"
+        if image.size is not None and image.size > settings.upload_max_bytes:
+            raise file_too_large()
+
+        is_pdf_conversion: bool = convert and ".pdf" in image.filename
+        file_name: str = (
+            image.filename.replace(".pdf", ".png")
+            if is_pdf_conversion
+            else image.filename
+        )
+        content_type: str = (
+            "image/png"
+            if image.content_type == "application/pdf" and convert
+            else image.content_type
+        )
+        digest: str = await run_in_threadpool(
+            self.content_digest, image, resize, convert
+        )
+
+        async with AsyncSessionLocal() as db:
+            stored_file, claimed = await crud_stored_file.aacquire(
+                db,
+                obj_in=StoredFileCreate(
+                    hash=digest,
+                    object_key=f"{directory}/{digest}{os.path.splitext(file_name)[1]}",
+                    content_type=content_type,
+                ),
+            )
+        url: str = f"{self.cdn_url}/{stored_file.object_key}"
 
         try:
-            content_type: str = (
-                "image/png"
-                if image.content_type == "application/pdf" and convert
-                else image.content_type
+            # Same content is being uploaded by someone else, wait for it and
+            # take over when that upload is given up
+            while not claimed and stored_file.status != READY:
+                await asyncio.sleep(settings.upload_wait_interval)
+                async with AsyncSessionLocal() as db:
+                    stored_file = await crud_stored_file.aget(db, stored_file.id)
+                    claimed = stored_file.status != READY and (
+                        await crud_stored_file.aclaim(db, id=stored_file.id)
+                    )
+            if not claimed:
+                return url
+
+            size, width, height, variants = await self.process_and_upload(
+                image,
+                stored_file.object_key,
+                content_type,
+                resize,
+                is_pdf_conversion,
             )
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=object_name,
-                Body=image_content,
-                ACL="public-read",
-                ContentType=content_type,
+        except BaseException:
+            async with AsyncSessionLocal() as db:
+                await crud_stored_file.aabandon(db, id=stored_file.id, claimed=claimed)
+            raise
+
+        async with AsyncSessionLocal() as db:
+            await crud_stored_file.amark_ready(
+                db,
+                id=stored_file.id,
+                size=size,
+                width=width,
+                height=height,
+                variants=variants,
             )
+        return url
+
+    @staticmethod
+    def content_digest(image: UploadFile, resize: bool, convert: bool) -> str:
+        """
+        SHA-256 of the upload together with the processing options, so the
+        same bytes saved with other options are stored separately.
+        """
+        digest = hashlib.sha256(f"resize={resize};convert={convert};".encode())
+        image.file.seek(0)
+        while chunk := image.file.read(1024 * 1024):
+            digest.update(chunk)
+        image.file.seek(0)
+        return digest.hexdigest()
+
+    async def process_and_upload(
+        self,
+        image: UploadFile,
+        object_name: str,
+        content_type: str,
+        resize: bool,
+        is_pdf_conversion: bool,
+    ) -> tuple[int, int | None, int | None, dict[str, list[int]] | None]:
+        """
+        Normalise the upload as requested and store it, returns size and
+        dimensions along with the widths of the variants rendered per format.
+        """
+        width: int | None = None
+        height: int | None = None
+        rendered: dict[str, list[int]] | None = None
+        try:
+            if is_pdf_conversion:
+                temp_directory = "temp"
+                os.makedirs(temp_directory, exist_ok=True)
+                # poppler renders in a subprocess, a thread is enough to wait on it
+                local_path = await run_in_threadpool(
+                    self.pdf_to_single_png, image, temp_directory, f"{uuid4().hex}.pdf"
+                )
+                size: int = await run_in_threadpool(
+                    self.upload_path, local_path, object_name, content_type
+                )
+            elif self.is_image(image.filename) and resize:
+                original: bytes = await image.read()
+                try:
+                    image_content, width, height, variants = await image_pool.run(
+                        resize_image,
+                        original,
+                        IMAGE_BASE_WIDTH,
+                        settings.image_max_pixels,
+                        settings.image_variant_widths,
+                        image_variant_formats(),
+                    )
+                except ImageTooLarge:
+                    raise file_too_large(detail="Image dimensions are too large.")
+                # The original is kept so other sizes can be rendered on demand
+                uploads = [
+                    (BytesIO(image_content), object_name, content_type),
+                    (
+                        BytesIO(original),
+                        self.original_key(object_name),
+                        image.content_type,
+                    ),
+                    *(
+                        (
+                            BytesIO(data),
+                            self.variant_key(object_name, w, fmt),
+                            f"image/{fmt}",
+                        )
+                        for w, fmt, data in variants
+                    ),
+                ]
+                sizes: list[int] = await asyncio.gather(
+                    *(
+                        run_in_threadpool(self.upload_fileobj, *upload)
+                        for upload in uploads
+                    )
+                )
+                size: int = sizes[0]
+                rendered = {fmt: [] for fmt in image_variant_formats()}
+                for w, fmt, _ in variants:
+                    rendered[fmt].append(w)
+            else:
+                # Straight from the spooled upload, never held in memory whole
+                await image.seek(0)
+                size: int = await run_in_threadpool(
+                    self.upload_fileobj, image.file, object_name, content_type
+                )
+        except HTTPException:
+            raise
+        except UploadTooLarge:
+            raise file_too_large()
         except Exception as e:
             logger.error(f"Failed to upload file: {e}")
             raise custom_exception(detail="Failed to upload file. Please try again.")
 
-        return f"{self.cdn_url}/{object_name}"
+        return size, width, height, rendered
+
+    async def save_pdf_pages(
+        self,
+        pdf: UploadFile,
+        directory: str = "common",
+        dpi: int = settings.pdf_dpi,
+    ) -> list[str]:
+        """Save every page of a PDF as its own PNG and return their URLs in order."""
+        file_name: str = f"{uuid4().hex}_{pdf.filename}"
+        temp_directory = "temp"
+        paths: list[str] = []
+        try:
+            paths = await run_in_threadpool(
+                self.pdf_to_pngs, pdf, temp_directory, file_name, dpi
+            )
+            object_names: list[str] = [
+                f"{directory}/{os.path.basename(path)}" for path in paths
+            ]
+            # Every upload is awaited before the pages are cleaned up
+            results: list = await asyncio.gather(
+                *(
+                    run_in_threadpool(self.upload_path, path, object_name, "image/png")
+                    for path, object_name in zip(paths, object_names)
+                ),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        except UploadTooLarge:
+            raise file_too_large()
+        except Exception as e:
+            logger.error(f"Failed to upload file: {e}")
+            raise custom_exception(detail="Failed to upload file. Please try again.")
+        finally:
+            # upload_path removes the pages it got to, this catches the rest
+            await run_in_threadpool(self.remove_local_files, paths)
+
+        return [f"{self.cdn_url}/{object_name}" for object_name in object_names]
+
+    @staticmethod
+    def original_key(object_key: str) -> str:
+        """Key of the unprocessed upload kept next to a resized image."""
+        base, ext = os.path.splitext(object_key)
+        return f"{base}_original{ext}"
+
+    @staticmethod
+    def variant_key(object_key: str, width: int, fmt: str) -> str:
+        """Key of a pre-rendered responsive variant of an image."""
+        return f"{os.path.splitext(object_key)[0]}_{width}.{fmt}"
+
+    def variant_urls(self, stored_file: StoredFile) -> dict[str, dict[int, str]]:
+        """
+        URLs of the pre-rendered variants of an image, by format and width.
+        Only the variants recorded at upload exist, widths at or above the
+        source width were never rendered.
+        """
+        object_key: str = stored_file.object_key
+        return {
+            fmt: {
+                width: f"{self.cdn_url}/{self.variant_key(object_key, width, fmt)}"
+                for width in widths
+            }
+            for fmt, widths in (stored_file.variants or {}).items()
+        }
+
+    def read_original(self, object_key: str) -> bytes:
+        """Download the original of a stored image, falling back to the object itself."""
+        for key in (self.original_key(object_key), object_key):
+            try:
+                response = self.client.get_object(Bucket=self.bucket_name, Key=key)
+            except self.client.exceptions.NoSuchKey:
+                continue
+            if response["ContentLength"] > settings.upload_max_bytes:
+                raise UploadTooLarge(
+                    f"Original is larger than {settings.upload_max_bytes} bytes"
+                )
+            return response["Body"].read()
+        raise FileNotFoundError(object_key)
 
     def extract_object_key_from_url(self, url: str) -> str:
         """Extract the object key from the URL."""
         return url.replace(f"{self.cdn_url}/", "")
 
-    def remove_single_file(self, file_url: str) -> bool:
-        """Remove a single file from the CDN."""
+    def keys_to_delete(
+        self, file_urls: list[str]
+    ) -> tuple[dict[str, list[str]], list[str]]:
+        """
+        Release the references held by `file_urls` and map each URL to the
+        object keys that can be deleted now. Deduplicated files still in use
+        map to no keys, unused images take their original and variants along.
+        Also returns the object keys released for good, see `settle`.
+        """
+        object_keys: dict[str, str] = {
+            file_url: self.extract_object_key_from_url(file_url)
+            for file_url in file_urls
+        }
+        with SessionLocal() as db:
+            released = crud_stored_file.release(
+                db, object_keys=list(object_keys.values())
+            )
+
+        keys: dict[str, list[str]] = {}
+        for file_url, object_key in object_keys.items():
+            unused: bool | None = released[object_key]
+            # Untracked files take everything along as well, a retry after a
+            # failed delete must not leave the original and variants behind
+            keys[file_url] = (
+                []
+                if unused is False
+                else [
+                    object_key,
+                    self.original_key(object_key),
+                    *(
+                        self.variant_key(object_key, width, fmt)
+                        for width in settings.image_variant_widths
+                        for fmt in image_variant_formats()
+                    ),
+                ]
+            )
+        return keys, [key for key, unused in released.items() if unused]
+
+    def settle(
+        self, keys: dict[str, list[str]], released: list[str], failed: dict[str, str]
+    ) -> None:
+        """
+        Finish releasing files once the delete requests are done. Files with
+        an object that failed to delete keep their reference, so removing
+        them again retries every key instead of finding them untracked.
+        """
+        if not released:
+            return
+        # The object key of a file leads the keys deleted for it
+        failed_files: dict[str, bool] = {
+            object_keys[0]: object_keys[0] in failed
+            for object_keys in keys.values()
+            if object_keys
+            and object_keys[0] in released
+            and any(key in failed for key in object_keys)
+        }
         try:
-            object_key = self.extract_object_key_from_url(file_url)
-            self.client.delete_object(Bucket=self.bucket_name, Key=object_key)
+            with SessionLocal() as db:
+                crud_stored_file.settle(
+                    db,
+                    deleted=[k for k in released if k not in failed_files],
+                    failed=failed_files,
+                )
         except Exception as e:
-            logger.error(f"Error deleting file {file_url}: {e}")
-            return False
-        return True
+            # Rows left deleting are taken over by the next upload of the content
+            logger.error(f"Error settling released files: {e}")
+
+    @staticmethod
+    def delete_results(
+        keys: dict[str, list[str]], failed: dict[str, str]
+    ) -> dict[str, bool]:
+        """A URL is removed when none of the objects behind it failed to delete."""
+        for key, message in failed.items():
+            logger.error(f"Error deleting object {key}: {message}")
+        return {
+            file_url: not any(key in failed for key in object_keys)
+            for file_url, object_keys in keys.items()
+        }
+
+    def remove_files(self, file_urls: list[str]) -> dict[str, bool]:
+        """
+        Remove many files from the CDN with one delete_objects request per
+        1000 keys, returns per URL whether it was removed.
+        """
+        try:
+            keys, released = self.keys_to_delete(file_urls)
+        except Exception as e:
+            logger.error(f"Error releasing files: {e}")
+            return dict.fromkeys(file_urls, False)
+
+        all_keys: list[str] = [
+            key for object_keys in keys.values() for key in object_keys
+        ]
+        failed: dict[str, str] = {}
+        for i in range(0, len(all_keys), S3_DELETE_BATCH_SIZE):
+            batch: list[str] = all_keys[i : i + S3_DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except Exception as e:
+                failed.update(dict.fromkeys(batch, str(e)))
+                continue
+            failed.update(
+                {
+                    error["Key"]: error.get("Message", "")
+                    for error in response.get("Errors", [])
+                }
+            )
+        self.settle(keys, released, failed)
+        return self.delete_results(keys, failed)
+
+    async def aremove_files(self, file_urls: list[str]) -> dict[str, bool]:
+        """Async variant of `remove_files` on the shared aiobotocore client."""
+        try:
+            keys, released = await run_in_threadpool(self.keys_to_delete, file_urls)
+        except Exception as e:
+            logger.error(f"Error releasing files: {e}")
+            return dict.fromkeys(file_urls, False)
+
+        client = await async_storage_client.get()
+        all_keys: list[str] = [
+            key for object_keys in keys.values() for key in object_keys
+        ]
+        batches: list[list[str]] = [
+            all_keys[i : i + S3_DELETE_BATCH_SIZE]
+            for i in range(0, len(all_keys), S3_DELETE_BATCH_SIZE)
+        ]
+        responses = await asyncio.gather(
+            *(
+                client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+        failed: dict[str, str] = {}
+        for batch, response in zip(batches, responses):
+            if isinstance(response, Exception):
+                failed.update(dict.fromkeys(batch, str(response)))
+                continue
+            failed.update(
+                {
+                    error["Key"]: error.get("Message", "")
+                    for error in response.get("Errors", [])
+                }
+            )
+        await run_in_threadpool(self.settle, keys, released, failed)
+        return self.delete_results(keys, failed)
+
+    def remove_single_file(self, file_url: str) -> bool:
+        """
+        Remove a single file from the CDN. Deduplicated files are only deleted
+        once the last reference to them is released.
+        """
+        return self.remove_files([file_url])[file_url]
+
+
+image_handler = ImageHandler()
@@ -0,0 +1,266 @@
+import gzip
+import importlib.util
+import logging
+import os
+import re
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import Optional
+from uuid import uuid4
+
+from fastapi import BackgroundTasks
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from core.cache import TTLCache
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Content addressed names, a SHA-256 digest with an optional variant suffix
+# (see ImageHandler.original_key/variant_key). The content never changes
+# under such a name.
+HASHED_NAME = re.compile(r"([0-9a-f]{64})(?:_[0-9a-z]+)?\.[0-9A-Za-z]+")
+COMPRESSIBLE_TYPES: tuple[str, ...] = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+# Preferred first, brotli only when the module is installed
+ENCODINGS: dict[str, str] = {
+    encoding: suffix
+    for encoding, suffix in (("br", "br"), ("gzip", "gz"))
+    if encoding != "br" or importlib.util.find_spec("brotli") is not None
+}
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Quality value of each coding named in an Accept-Encoding header."""
+    qualities: dict[str, float] = {}
+    for part in header.split(","):
+        coding, *params = (item.strip() for item in part.split(";"))
+        if not coding:
+            continue
+        quality: float = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+class LargeFileResponse(FileResponse):
+    """
+    File response for large files. Uses the ASGI zero-copy extension
+    (sendfile) when the server offers it, otherwise streams bigger chunks.
+    """
+
+    chunk_size = 1024 * 1024
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if "http.response.zerocopy" not in scope.get("extensions", {}) or (
+            "range" in Headers(scope=scope)
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "count": self.stat_result.st_size,
+                        "more_body": False,
+                    }
+                )
+        if self.background is not None:
+            await self.background()
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for /media with caching and compression:
+    - `.br`/`.gz` siblings are served to clients that accept them and are
+      written in the background after the first request for a compressible file
+    - strong ETags, and immutable Cache-Control for content-hashed names
+    - small hot files are served from memory, large ones with sendfile
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hot_files: TTLCache = TTLCache(
+            maxsize=settings.media_memory_cache_entries, ttl=3600
+        )
+        # Files already compressed or found not worth compressing, by version
+        self.compressed: TTLCache = TTLCache(maxsize=10000, ttl=3600)
+
+    @staticmethod
+    def cache_control(path: str) -> str:
+        if HASHED_NAME.fullmatch(os.path.basename(path)):
+            return IMMUTABLE_CACHE_CONTROL
+        return f"public, max-age={settings.media_max_age}, must-revalidate"
+
+    @staticmethod
+    def etag(path: str, stat_result: os.stat_result, encoding: Optional[str]) -> str:
+        """
+        Strong validator of one representation of a file. Hashed names carry
+        their content hash, other files are identified by inode, mtime and size.
+        """
+        name: str = os.path.basename(path)
+        if HASHED_NAME.fullmatch(name):
+            tag: str = os.path.splitext(name)[0]
+        else:
+            tag = (
+                f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}"
+                f"-{stat_result.st_size:x}"
+            )
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    @staticmethod
+    def is_compressible(media_type: str, size: int) -> bool:
+        return (
+            media_type.startswith(COMPRESSIBLE_TYPES)
+            and settings.media_compress_min_bytes
+            <= size
+            <= settings.media_compress_max_bytes
+        )
+
+    @staticmethod
+    def precompressed(
+        path: str, stat_result: os.stat_result, request_headers: Headers
+    ) -> tuple[Optional[str], Optional[os.stat_result]]:
+        """
+        Best encoding the client accepts with an up to date sibling file, by
+        the client's quality values and then our preference.
+        """
+        qualities: dict[str, float] = parse_accept_encoding(
+            request_headers.get("accept-encoding", "")
+        )
+        wildcard: float = qualities.get("*", 0.0)
+        candidates: list[str] = sorted(
+            (
+                encoding
+                for encoding in ENCODINGS
+                if qualities.get(encoding, wildcard) > 0
+            ),
+            key=lambda encoding: -qualities.get(encoding, wildcard),
+        )
+        for encoding in candidates:
+            suffix: str = ENCODINGS[encoding]
+            try:
+                sibling: os.stat_result = os.stat(f"{path}.{suffix}")
+            except FileNotFoundError:
+                continue
+            # Siblings carry the mtime of the file they were made from
+            if sibling.st_mtime_ns == stat_result.st_mtime_ns:
+                return encoding, sibling
+        return None, None
+
+    def compress(self, path: str) -> None:
+        """Write the compressed siblings of a file, each one atomically."""
+        try:
+            stat_result: os.stat_result = os.stat(path)
+            with open(path, "rb") as file:
+                data: bytes = file.read()
+            for encoding, suffix in ENCODINGS.items():
+                if encoding == "br":
+                    import brotli
+
+                    compressed: bytes = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) >= len(data):
+                    continue
+                sibling: str = f"{path}.{suffix}"
+                temp_path: str = f"{sibling}.{uuid4().hex}.tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(compressed)
+                os.utime(
+                    temp_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns)
+                )
+                os.replace(temp_path, sibling)
+        except OSError as e:
+            logger.warning(f"Compressing {path} failed: {e}")
+
+    def remember(self, key: tuple, path: str) -> None:
+        with open(path, "rb") as file:
+            self.hot_files.set(key, file.read())
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path: str = str(full_path)
+        media_type: str = guess_type(path)[0] or "application/octet-stream"
+        headers: dict[str, str] = {"cache-control": self.cache_control(path)}
+        background = BackgroundTasks()
+
+        encoding: Optional[str] = None
+        if self.is_compressible(media_type, stat_result.st_size):
+            headers["vary"] = "Accept-Encoding"
+            encoding, sibling = self.precompressed(path, stat_result, request_headers)
+            version: tuple = (path, stat_result.st_mtime_ns)
+            if encoding is None and self.compressed.get(version) is None:
+                self.compressed.set(version, True)
+                background.add_task(self.compress, path)
+        headers["etag"] = self.etag(path, stat_result, encoding)
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+            path, stat_result = f"{path}.{ENCODINGS[encoding]}", sibling
+
+        key: tuple = (path, stat_result.st_mtime_ns, stat_result.st_size)
+        # Range requests go to FileResponse, which knows how to answer them
+        if (
+            "range" not in request_headers
+            and (content := self.hot_files.get(key)) is not None
+        ):
+            headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+            response: Response = Response(
+                content, status_code=status_code, headers=headers, media_type=media_type
+            )
+        else:
+            response_class: type[FileResponse] = (
+                LargeFileResponse
+                if stat_result.st_size >= settings.media_sendfile_min_bytes
+                else FileResponse
+            )
+            response = response_class(
+                path,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                stat_result=stat_result,
+            )
+            if stat_result.st_size <= settings.media_memory_cache_max_file:
+                background.add_task(self.remember, key, path)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        response.background = background
+        return response
+
+
+media_files = MediaFiles(directory=settings.media_dir, check_dir=False)
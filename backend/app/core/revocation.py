@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from crud.crud_revoked_token import crud_revoked_token
+from db.session import AsyncSessionLocal
+from schemas.revoked_token import RevokedTokenCreate
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity: int = capacity
+        self.size: int = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes: int = max(1, round(self.size / capacity * math.log(2)))
+        self.bits: bytearray = bytearray((self.size + 7) // 8)
+        self.count: int = 0
+
+    def positions(self, item: str) -> Iterator[int]:
+        """Bit positions of an item, derived from a single digest."""
+        digest: bytes = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first: int = int.from_bytes(digest[:8], "little")
+        step: int = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(item)
+        )
+
+
+class RevocationList:
+    """
+    Denylist of token ids. The revokedtoken table is the source of truth, a
+    Bloom filter of its ids answers the common "not revoked" case in memory
+    and only probable positives are looked up in the database.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self.bloom: BloomFilter = BloomFilter(capacity, error_rate)
+        # Newest revocation time seen, by the database clock
+        self.last_seen: Optional[datetime] = None
+        self.lookups: int = 0
+        self.probable_hits: int = 0
+        self.false_positives: int = 0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    async def rebuild(self) -> None:
+        """Load every unexpired revocation into a fresh filter."""
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                rows = await crud_revoked_token.aget_jtis_since(db)
+            capacity: int = self.capacity
+            while capacity < len(rows) * 2:
+                capacity *= 2
+            bloom = BloomFilter(capacity, self.error_rate)
+            for _, jti in rows:
+                bloom.add(jti)
+            self.bloom = bloom
+            self.last_seen = rows[-1][0] if rows else None
+
+    async def refresh(self) -> None:
+        """
+        Add revocations recorded since the last refresh, by any process. The
+        scan overlaps the previous one, a revocation whose transaction
+        committed after a newer one was already seen is still picked up.
+        """
+        async with self._lock:
+            since: Optional[datetime] = (
+                self.last_seen - timedelta(seconds=settings.revocation_refresh_overlap)
+                if self.last_seen is not None
+                else None
+            )
+            async with AsyncSessionLocal() as db:
+                rows = await crud_revoked_token.aget_jtis_since(db, since=since)
+            # Rows from the overlap are mostly in the filter already
+            new_jtis: list[str] = [jti for _, jti in rows if jti not in self.bloom]
+            if self.bloom.count + len(new_jtis) <= self.bloom.capacity:
+                for jti in new_jtis:
+                    self.bloom.add(jti)
+                if rows and (self.last_seen is None or rows[-1][0] > self.last_seen):
+                    self.last_seen = rows[-1][0]
+                return
+        # Past capacity the false positive rate climbs, start over with a bigger one
+        await self.rebuild()
+
+    async def prune(self) -> int:
+        """Drop expired revocations and rebuild the filter to forget them."""
+        async with AsyncSessionLocal() as db:
+            pruned: int = await crud_revoked_token.aprune(db)
+        await self.rebuild()
+        return pruned
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        *,
+        jti: str,
+        user_id: Optional[int],
+        expires_at: datetime,
+    ) -> None:
+        await crud_revoked_token.arevoke(
+            db,
+            obj_in=RevokedTokenCreate(jti=jti, user_id=user_id, expires_at=expires_at),
+        )
+        self.bloom.add(jti)
+
+    async def is_revoked(self, db: AsyncSession, jti: Optional[str]) -> bool:
+        # Tokens issued before ids were added cannot be revoked
+        if jti is None:
+            return False
+        self.lookups += 1
+        if jti not in self.bloom:
+            return False
+        self.probable_hits += 1
+        revoked: bool = await crud_revoked_token.ais_revoked(db, jti=jti)
+        self.false_positives += not revoked
+        return revoked
+
+    async def monitor(self) -> None:
+        last_prune: float = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.revocation_refresh_interval)
+            try:
+                if time.monotonic() - last_prune >= settings.revocation_prune_interval:
+                    last_prune = time.monotonic()
+                    await self.prune()
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Refreshing revoked tokens failed: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": self.bloom.count,
+            "capacity": self.bloom.capacity,
+            "size_bytes": len(self.bloom.bits),
+            "hashes": self.bloom.hashes,
+            "lookups": self.lookups,
+            "probable_hits": self.probable_hits,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_list = RevocationList(
+    capacity=settings.revocation_bloom_capacity,
+    error_rate=settings.revocation_bloom_error_rate,
+)
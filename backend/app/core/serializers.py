@@ -0,0 +1,63 @@
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from starlette import status
+
+from core.versioning import etag, is_not_modified
+
+
+class ORMSerializer:
+    """
+    JSON serializer for one response schema, built once. It reads the
+    schema's fields straight off ORM objects and dumps them with orjson,
+    skipping the validation FastAPI does for a `response_model`. Only use it
+    for data the schema already describes, such as rows of our own tables.
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        self.schema: type[BaseModel] = schema
+        self.fields: tuple[str, ...] = tuple(schema.model_fields)
+        getter = attrgetter(*self.fields)
+        # attrgetter returns a bare value rather than a tuple for a single field
+        self.values: Callable[[Any], tuple] = (
+            getter if len(self.fields) > 1 else lambda obj: (getter(obj),)
+        )
+
+    def to_dict(self, obj: Any) -> dict[str, Any]:
+        return dict(zip(self.fields, self.values(obj)))
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(self.to_dict(obj))
+
+    def dumps_many(self, objs: Iterable[Any]) -> bytes:
+        return orjson.dumps([self.to_dict(obj) for obj in objs])
+
+    def response(
+        self,
+        obj: Any,
+        status_code: int = status.HTTP_200_OK,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Response:
+        return Response(
+            self.dumps(obj),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/json",
+        )
+
+    def conditional_response(self, obj: Any, if_none_match: Optional[str]) -> Response:
+        """
+        Response for a versioned object carrying its ETag, or an empty 304
+        without serialising anything when the client already has this version.
+        """
+        # Clients revalidate every time, shared caches never store it
+        headers: dict[str, str] = {
+            "etag": etag(obj),
+            "cache-control": "private, no-cache",
+        }
+        if is_not_modified(if_none_match, headers["etag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return self.response(obj, headers=headers)
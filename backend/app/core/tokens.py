@@ -0,0 +1,95 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import jwt
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+
+from core.cache import TTLCache
+from core.config import Settings, settings
+
+ASYMMETRIC_PREFIXES: tuple[str, ...] = ("RS", "PS", "ES", "EdDSA")
+
+
+def read_key(value: Optional[str], path: Optional[str]) -> Optional[bytes]:
+    """PEM key given inline or as the path of a file holding it."""
+    if value:
+        return value.encode()
+    if path:
+        with open(path, "rb") as file:
+            return file.read()
+    return None
+
+
+@dataclass(frozen=True)
+class TokenSettings:
+    """
+    Algorithm and keys, loaded once. Asymmetric algorithms (ES256, EdDSA, ...)
+    sign with TOKEN_PRIVATE_KEY and verify with TOKEN_PUBLIC_KEY, so other
+    services only need the public key to verify tokens locally.
+    """
+
+    algorithm: str
+    signing_key: Any
+    verification_key: Any
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "TokenSettings":
+        algorithm: str = settings.token_algorithm
+        if not algorithm.startswith(ASYMMETRIC_PREFIXES):
+            secret: Optional[str] = settings.token_secret
+            return cls(algorithm=algorithm, signing_key=secret, verification_key=secret)
+
+        private_pem: Optional[bytes] = read_key(
+            settings.token_private_key, settings.token_private_key_file
+        )
+        public_pem: Optional[bytes] = read_key(
+            settings.token_public_key, settings.token_public_key_file
+        )
+        signing_key = load_pem_private_key(private_pem, None) if private_pem else None
+        if public_pem:
+            verification_key = load_pem_public_key(public_pem)
+        elif signing_key is not None:
+            verification_key = signing_key.public_key()
+        else:
+            raise RuntimeError(
+                f"{algorithm} needs TOKEN_PUBLIC_KEY or TOKEN_PRIVATE_KEY"
+            )
+        return cls(
+            algorithm=algorithm,
+            signing_key=signing_key,
+            verification_key=verification_key,
+        )
+
+
+token_settings: TokenSettings = TokenSettings.from_settings(settings)
+verified_tokens: TTLCache = TTLCache(
+    maxsize=settings.token_cache_size, ttl=settings.token_cache_ttl
+)
+
+
+def encode_token(payload: dict[str, Any]) -> str:
+    return jwt.encode(
+        payload, token_settings.signing_key, algorithm=token_settings.algorithm
+    )
+
+
+def decode_token(token: str) -> dict[str, Any]:
+    """
+    Verify a token and return its claims. Tokens verified recently are served
+    from `verified_tokens` by digest until they expire. Callers get their own
+    copy, so changing it cannot leak into later requests. Raises `jwt.PyJWTError`.
+    """
+    digest: bytes = hashlib.sha256(token.encode()).digest()
+    payload: Optional[dict[str, Any]] = verified_tokens.get(digest)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return dict(payload)
+    payload = jwt.decode(
+        token, token_settings.verification_key, algorithms=[token_settings.algorithm]
+    )
+    verified_tokens.set(digest, dict(payload))
+    return payload
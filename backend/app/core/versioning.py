@@ -0,0 +1,56 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+from core.exceptions import precondition_failed
+from db.base_class import Versioned
+
+
+def etag(db_obj: Versioned) -> str:
+    """
+    Weak ETag of a versioned row. It names a state of the row rather than
+    exact response bytes, any serialisation of that state shares it.
+    """
+    return f'W/"{db_obj.__tablename__}-{db_obj.id}-{db_obj.version}"'
+
+
+def collection_etag(db_objs: Iterable[Versioned], *extra: Any) -> str:
+    """
+    Weak ETag of a list of versioned rows, it changes when a row is added,
+    removed or updated. `extra` holds anything else the response depends on.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for db_obj in db_objs:
+        digest.update(f"{db_obj.__tablename__}-{db_obj.id}-{db_obj.version};".encode())
+    for value in extra:
+        digest.update(f"{value};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def opaque_tags(header: str) -> set[str]:
+    """Entity tags listed in an If-Match or If-None-Match header, W/ stripped."""
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def is_not_modified(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether the client already holds `tag`, by weak comparison."""
+    if not if_none_match:
+        return False
+    tags: set[str] = opaque_tags(if_none_match)
+    return "*" in tags or tag.removeprefix("W/") in tags
+
+
+def if_match_version(db_obj: Versioned, if_match: str) -> Optional[int]:
+    """
+    Version an If-Match header requires `db_obj` to be at, None for "*".
+    Our ETags are weak, so they are compared weakly here as well. A header
+    naming no version of this row can never match and fails right away.
+    """
+    tags: set[str] = opaque_tags(if_match)
+    if "*" in tags:
+        return None
+    prefix: str = f'"{db_obj.__tablename__}-{db_obj.id}-'
+    for tag in tags:
+        version: str = tag.removeprefix(prefix).removesuffix('"')
+        if tag.startswith(prefix) and version.isdigit():
+            return int(version)
+    raise precondition_failed()
@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, TypeVar
+
+from core.config import settings
+from core.exceptions import service_unavailable
+
+T = TypeVar("T")
+
+
+class BoundedProcessPool:
+    """
+    Process pool for CPU bound work (hashing, image processing) that keeps it
+    off the event loop and the Starlette threadpool. Once `max_workers + max_queue`
+    calls are pending further submissions are rejected with 503 instead of queueing
+    without limit.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name: str = name
+        self.max_workers: int = max_workers
+        self.max_queue: int = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending: int = 0
+        self.completed: int = 0
+        self.rejected: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+        # Sync callers run in threadpool threads, next to the event loop
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use rather than at import."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def acquire(self, count: int = 1) -> None:
+        """Reserve `count` slots, or reject with 503 when the queue is full."""
+        with self._lock:
+            if self.pending + count > self.max_workers + self.max_queue:
+                self.rejected += count
+                raise service_unavailable()
+            self.pending += count
+
+    def release(self, count: int, elapsed: float) -> None:
+        with self._lock:
+            self.pending -= count
+            self.completed += count
+            self.total_latency += elapsed * count
+            self.max_latency = max(self.max_latency, elapsed)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a picklable module level function in the pool and await its result."""
+        self.acquire()
+        started: float = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, fn, *args
+            )
+        finally:
+            self.release(1, time.perf_counter() - started)
+
+    async def map(self, fn: Callable[[Any], T], items: List[Any]) -> List[T]:
+        """
+        Run `fn` over many items in parallel, at most one batch per worker in
+        flight so a large bulk job does not trip the queue bound on its own.
+        """
+        results: List[T] = []
+        for i in range(0, len(items), self.max_workers):
+            batch = items[i : i + self.max_workers]
+            results.extend(
+                await asyncio.gather(*(self.run(fn, item) for item in batch))
+            )
+        return results
+
+    def map_sync(self, fn: Callable[[Any], T], items: List[Any]) -> List[T]:
+        """Blocking `map` for sync callers, with the same queue bound and metrics."""
+        results: List[T] = []
+        for i in range(0, len(items), self.max_workers):
+            batch = items[i : i + self.max_workers]
+            self.acquire(len(batch))
+            started: float = time.perf_counter()
+            try:
+                results.extend(self.executor.map(fn, batch))
+            finally:
+                self.release(len(batch), time.perf_counter() - started)
+        return results
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "queue_depth": max(self.pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_ms": (
+                round(self.total_latency / self.completed * 1000, 2)
+                if self.completed
+                else 0.0
+            ),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
+
+
+hashing_pool = BoundedProcessPool(
+    name="hashing",
+    max_workers=settings.hash_pool_workers or os.cpu_count() or 1,
+    max_queue=settings.hash_pool_max_queue,
+)
+
+image_pool = BoundedProcessPool(
+    name="images",
+    max_workers=settings.image_pool_workers or os.cpu_count() or 1,
+    max_queue=settings.image_pool_max_queue,
+)
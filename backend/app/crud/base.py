@@ -1,35 +1,111 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Literal,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import Column, UnaryExpression, desc
-from sqlalchemy.orm import Session, Query
+from sqlalchemy import (
+    Column,
+    Select,
+    UnaryExpression,
+    column,
+    delete,
+    desc,
+    insert,
+    inspect,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query, make_transient_to_detached
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.attributes import set_committed_value
 
-from core.exceptions import object_does_not_exist
-from db.base_class import Base
+from core.cache import CacheBackend
+from core.exceptions import (
+    custom_exception,
+    object_does_not_exist,
+    precondition_failed,
+)
+from core.versioning import if_match_version
+from db.base_class import Base, Versioned
+from db.session import AsyncSessionLocal
+from schemas.page import Page
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+MAX_PAGE_SIZE: int = 500
+BULK_CHUNK_SIZE: int = 1000
+# Instance state flag of objects rebuilt from the cache rather than loaded
+CACHED: str = "cached"
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[CacheBackend] = None,
+        lean_writes: bool = False,
+        sortable: tuple[str, ...] = ("id",),
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cache`: Optional cache keyed by object ID, invalidated on update and remove
+        * `lean_writes`: Create and update with a single ``... RETURNING`` statement
+          instead of add, commit and a refresh SELECT
+        * `sortable`: Columns keyset pages may be ordered by, they must be
+          non-nullable since a NULL in the cursor matches no row
         """
         self.model = model
+        self.cache = cache
+        self.lean_writes = lean_writes
+        self.versioned: bool = issubclass(model, Versioned)
+        self.columns: dict[str, Column[Any]] = {
+            attr.key: attr.columns[0] for attr in inspect(model).column_attrs
+        }
+        if nullable := [key for key in sortable if self.columns[key].nullable]:
+            raise ValueError(f"Cannot keyset paginate by nullable {nullable}.")
+        self.sortable: tuple[str, ...] = sortable
+
+    def invalidate(self, id: Any) -> None:
+        """Drop a cached object so the next read goes to the database."""
+        if self.cache is not None:
+            self.cache.delete(id)
 
     def apply_ordering(
         self,
-        query: Query[Any],
+        query: Query[Any] | Select[Any],
         model: Type[ModelType],
         order_by: str,
         default: Column[str] | UnaryExpression = None,
-    ) -> Query[Type[ModelType]]:
+    ) -> Query[Type[ModelType]] | Select[Any]:
         """Apply ordering to the query based on the order_by parameter."""
         if order_by:
             descending: bool = order_by.startswith(
@@ -45,6 +121,216 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         return query
 
+    def encode_cursor(self, db_obj: ModelType, column: Column[Any]) -> str:
+        """Build the opaque token pointing right after the given object."""
+        raw: str = json.dumps(
+            [jsonable_encoder(getattr(db_obj, column.key)), db_obj.id]
+        )
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def coerce_cursor_value(value: Any, python_type: type) -> Any:
+        """Check a decoded cursor value against the column type, raise on mismatch."""
+        if python_type in (datetime, date):
+            return python_type.fromisoformat(value)
+        if python_type is Decimal and isinstance(value, (int, float)):
+            return Decimal(str(value))
+        # bool is an int, but never a valid value of an integer column
+        if isinstance(value, bool) is not (python_type is bool) or not isinstance(
+            value, python_type
+        ):
+            raise TypeError(f"Expected {python_type.__name__}.")
+        return value
+
+    def decode_cursor(self, cursor: str, column: Column[Any]) -> tuple[Any, Any]:
+        """
+        Turn a token back into the (order value, id) pair it points after.
+        Cursors come from clients, so anything malformed is a 400.
+        """
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value = self.coerce_cursor_value(value, column.type.python_type)
+            last_id = self.coerce_cursor_value(
+                last_id, self.columns["id"].type.python_type
+            )
+        except (ValueError, TypeError):
+            raise custom_exception(detail="Invalid cursor.")
+        return value, last_id
+
+    def keyset_query(
+        self, *, order_by: str = "id", cursor: Optional[str] = None, limit: int = 100
+    ) -> tuple[Select[Any], Column[Any]]:
+        """
+        Build the SELECT for one keyset page. Rows are ordered by `order_by`
+        (``-field`` for descending, one of `sortable`) with the ID as
+        tiebreaker, and the cursor becomes a row value comparison the index
+        can seek to instead of an OFFSET scan.
+        """
+        descending: bool = order_by.startswith("-")
+        if order_by.lstrip("-") not in self.sortable:
+            raise custom_exception(detail=f"Cannot order by '{order_by}'.")
+        column: Column[Any] = self.columns[order_by.lstrip("-")]
+        id_column: Column[Any] = self.model.id
+
+        query: Select[Any] = select(self.model)
+        if cursor:
+            value, last_id = self.decode_cursor(cursor, column)
+            key = tuple_(column, id_column)
+            query = query.where(
+                key < tuple_(value, last_id)
+                if descending
+                else key > tuple_(value, last_id)
+            )
+        if descending:
+            query = query.order_by(desc(column), desc(id_column))
+        else:
+            query = query.order_by(column, id_column)
+        # One extra row tells whether there is a next page
+        return query.limit(min(max(limit, 1), MAX_PAGE_SIZE) + 1), column
+
+    def build_page(
+        self, rows: List[ModelType], column: Column[Any], limit: int
+    ) -> Page:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        if len(rows) <= limit:
+            return Page(items=rows)
+        items: List[ModelType] = rows[:limit]
+        return Page(items=items, next_cursor=self.encode_cursor(items[-1], column))
+
+    def lean_changes(
+        self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> dict[str, Any]:
+        """
+        Column values from `obj_in` that differ from what is loaded on `db_obj`.
+        An object served from the cache may be behind the row, so every value
+        set on `obj_in` is kept for it.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data: dict[str, Any] = obj_in.model_dump(exclude_unset=True)
+        state = inspect(db_obj)
+        loaded: dict[str, Any] = {} if state.info.get(CACHED) else state.dict
+        return {
+            key: value
+            for key, value in update_data.items()
+            if key in self.columns
+            and key != "id"
+            and (key not in loaded or loaded[key] != value)
+        }
+
+    def lean_insert_statement(self, obj_in: CreateSchemaType) -> Any:
+        data: dict[str, Any] = {
+            key: value
+            for key, value in obj_in.model_dump().items()
+            if key in self.columns
+        }
+        return insert(self.model).values(**data).returning(*self.columns.values())
+
+    def expected_version(
+        self, db_obj: ModelType, if_match: Optional[str]
+    ) -> Optional[int]:
+        """Version an If-Match header requires `db_obj` to be at, None when unconditional."""
+        if if_match is None:
+            return None
+        if not self.versioned:
+            raise custom_exception(detail=f"{self.model.__name__} is not versioned.")
+        return if_match_version(db_obj, if_match)
+
+    def version_statement(self, db_obj: ModelType) -> Any:
+        """SELECT of the version the row of `db_obj` is at in the database."""
+        return select(self.model.version).where(
+            self.model.id == inspect(db_obj).identity[0]
+        )
+
+    def check_version(
+        self, db_obj: ModelType, current: Optional[int], version: int
+    ) -> None:
+        """
+        Raise unless the row is still at `version`. Used when there is nothing
+        to write, so no UPDATE is there to check the If-Match precondition.
+        """
+        if current == version:
+            return
+        self.invalidate(inspect(db_obj).identity[0])
+        if current is None:
+            raise object_does_not_exist()
+        raise precondition_failed()
+
+    def lean_update_statement(
+        self,
+        db_obj: ModelType,
+        changes: dict[str, Any],
+        version: Optional[int] = None,
+    ) -> Any:
+        """
+        Core UPDATE skips the ORM version counter, so versioned rows are bumped
+        here. With `version` the row only matches while it is still at it.
+        """
+        statement = update(self.model).where(
+            self.model.id == inspect(db_obj).identity[0]
+        )
+        if self.versioned:
+            changes = {**changes, "version": self.model.version + 1}
+            if version is not None:
+                statement = statement.where(self.model.version == version)
+        return (
+            statement.values(**changes)
+            .returning(*self.columns.values())
+            .execution_options(synchronize_session=False)
+        )
+
+    def from_row(self, row: Any) -> ModelType:
+        """Build a persistent-ready instance from a RETURNING row, no SELECT needed."""
+        db_obj: ModelType = self.model(**dict(zip(self.columns, row)))  # type: ignore
+        make_transient_to_detached(db_obj)
+        return db_obj
+
+    def populate(self, db_obj: ModelType, row: Any) -> None:
+        """Load a RETURNING row into `db_obj` as its committed state."""
+        for key, value in zip(self.columns, row):
+            set_committed_value(db_obj, key, value)
+        inspect(db_obj).info.pop(CACHED, None)
+
+    @staticmethod
+    def chunked(items: List[Any], chunk_size: int) -> List[List[Any]]:
+        return [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    def bulk_update_statements(
+        self, objs_in: Dict[Any, Union[UpdateSchemaType, Dict[str, Any]]]
+    ) -> List[Any]:
+        """
+        Build one ``UPDATE ... FROM (VALUES ...)`` per distinct set of changed
+        columns, so rows changing the same fields share a single statement.
+        """
+        table = self.model.__table__
+        groups: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+        for id, obj_in in objs_in.items():
+            if isinstance(obj_in, dict):
+                update_data = obj_in
+            else:
+                update_data: dict[str, Any] = obj_in.model_dump(exclude_unset=True)
+            fields = tuple(sorted(k for k in update_data if k in table.c and k != "id"))
+            if fields:
+                groups.setdefault(fields, []).append(
+                    (id, *(update_data[k] for k in fields))
+                )
+
+        statements: List[Any] = []
+        for fields, rows in groups.items():
+            bulk_values = values(
+                column("id", table.c.id.type),
+                *(column(k, table.c[k].type) for k in fields),
+                name="bulk_values",
+            ).data(rows)
+            new_values: dict[str, Any] = {k: bulk_values.c[k] for k in fields}
+            if self.versioned:
+                new_values["version"] = table.c.version + 1
+            statements.append(
+                update(table).where(table.c.id == bulk_values.c.id).values(new_values)
+            )
+        return statements
+
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         """Get a single object by its ID."""
         return db.query(self.model).filter(self.model.id == id).first()
@@ -67,8 +353,27 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .all()
         )
 
+    def get_page(
+        self,
+        db: Session,
+        *,
+        order_by: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Page:
+        """Get one keyset page of objects and the cursor of the next one."""
+        query, column = self.keyset_query(order_by=order_by, cursor=cursor, limit=limit)
+        return self.build_page(list(db.scalars(query).all()), column, limit)
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """Create a new object."""
+        if self.lean_writes:
+            row = db.execute(self.lean_insert_statement(obj_in)).one()
+            db.commit()
+            db_obj: ModelType = self.from_row(row)
+            db.add(db_obj)
+            return db_obj
+
         obj_in_data = jsonable_encoder(obj_in)
         db_obj: ModelType = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
@@ -82,18 +387,56 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        if_match: Optional[str] = None,
     ) -> ModelType:
-        """Update an object."""
+        """
+        Update an object. `if_match` is the client's If-Match header, the update
+        fails with 412 when the row is no longer at the version it names.
+        """
+        version: Optional[int] = self.expected_version(db_obj, if_match)
+        if self.lean_writes:
+            if changes := self.lean_changes(db_obj, obj_in):
+                row = db.execute(
+                    self.lean_update_statement(db_obj, changes, version)
+                ).one_or_none()
+                if row is None:
+                    db.rollback()
+                    self.invalidate(inspect(db_obj).identity[0])
+                    if version is not None:
+                        raise precondition_failed()
+                    raise object_does_not_exist()
+                db.commit()
+                self.populate(db_obj, row)
+                self.invalidate(inspect(db_obj).identity[0])
+            elif version is not None:
+                self.check_version(
+                    db_obj, db.scalar(self.version_statement(db_obj)), version
+                )
+            return db_obj
+
         obj_data: Any = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data: dict[str, Any] = obj_in.model_dump(exclude_unset=True)
+        if version is not None and not self.lean_changes(db_obj, update_data):
+            self.check_version(
+                db_obj, db.scalar(self.version_statement(db_obj)), version
+            )
+        elif version is not None and version != db_obj.version:
+            self.invalidate(db_obj.id)
+            raise precondition_failed()
         for field in obj_data:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            self.invalidate(inspect(db_obj).identity[0])
+            raise precondition_failed()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
@@ -102,4 +445,357 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType = self.get_or_404(db=db, id=id)
         db.delete(db_obj)
         db.commit()
+        self.invalidate(id)
         return db_obj
+
+    def bulk_insert_statement(self) -> Any:
+        """
+        INSERT used for bulk creation. Subclasses may skip conflicting rows
+        with ``ON CONFLICT DO NOTHING``, the whole batch is then rejected.
+        """
+        return insert(self.model).returning(self.model)
+
+    def insert_rows(
+        self,
+        db: Session,
+        rows: List[Dict[str, Any]],
+        *,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[ModelType]:
+        """Insert prepared rows with one multi-row ``INSERT ... RETURNING`` per chunk."""
+        db_objs: List[ModelType] = []
+        for chunk in self.chunked(rows, chunk_size):
+            db_objs.extend(db.scalars(self.bulk_insert_statement(), chunk))
+        if skipped := len(rows) - len(db_objs):
+            db.rollback()
+            raise custom_exception(
+                detail=f"{skipped} of the {len(rows)} objects already exist."
+            )
+        db.commit()
+        return db_objs
+
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[CreateSchemaType],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[ModelType]:
+        """Create many objects in a few round trips."""
+        rows = [jsonable_encoder(obj_in) for obj_in in objs_in]
+        return self.insert_rows(db, rows, chunk_size=chunk_size)
+
+    def bulk_update(
+        self,
+        db: Session,
+        *,
+        objs_in: Dict[Any, Union[UpdateSchemaType, Dict[str, Any]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> int:
+        """Update many objects, keyed by ID, and return the number of rows changed."""
+        updated: int = 0
+        for chunk in self.chunked(list(objs_in.items()), chunk_size):
+            for statement in self.bulk_update_statements(dict(chunk)):
+                updated += db.execute(statement).rowcount
+        db.commit()
+        for id in objs_in:
+            self.invalidate(id)
+        return updated
+
+    def bulk_remove(
+        self, db: Session, *, ids: List[Any], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> int:
+        """Remove many objects by ID and return the number of rows deleted."""
+        removed: int = 0
+        for chunk in self.chunked(ids, chunk_size):
+            removed += db.execute(
+                delete(self.model).where(self.model.id.in_(chunk))
+            ).rowcount
+        db.commit()
+        for id in ids:
+            self.invalidate(id)
+        return removed
+
+    async def aget(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        """Get a single object by its ID without blocking the event loop."""
+        return await db.scalar(select(self.model).where(self.model.id == id))
+
+    async def aget_cached(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        """
+        Get a single object by its ID, serving it from the cache when possible.
+        Cached entries hold column values only, the instance is re-attached to
+        the session without a SELECT so it can still be updated or removed.
+        """
+        if self.cache is None:
+            return await self.aget(db=db, id=id)
+        if (data := self.cache.get(id)) is not None:
+            db_obj: ModelType = self.model(**data)  # type: ignore
+            make_transient_to_detached(db_obj)
+            inspect(db_obj).info[CACHED] = True
+            db.add(db_obj)
+            return db_obj
+        if db_obj := await self.aget(db=db, id=id):
+            self.cache.set(
+                id,
+                {
+                    attr.key: getattr(db_obj, attr.key)
+                    for attr in inspect(self.model).column_attrs
+                },
+            )
+        return db_obj
+
+    async def arevalidate(
+        self, db: AsyncSession, db_obj: ModelType
+    ) -> Optional[ModelType]:
+        """
+        `db_obj` as the database has it now, None when the row is gone. A
+        possibly cached versioned object costs one version lookup and is only
+        reloaded when another process changed the row since it was cached.
+        """
+        current: Optional[int] = await db.scalar(self.version_statement(db_obj))
+        if current != db_obj.version:
+            self.invalidate(inspect(db_obj).identity[0])
+            if current is None:
+                return None
+            await db.refresh(db_obj)
+        # Loaded state is now known to match the row
+        inspect(db_obj).info.pop(CACHED, None)
+        return db_obj
+
+    async def aget_or_404(self, db: AsyncSession, id: Any) -> ModelType:
+        """Get a single object by its ID or raise a 404 error."""
+        if result := await self.aget(db=db, id=id):
+            return result
+        raise object_does_not_exist()
+
+    async def aget_multi(
+        self, db: AsyncSession, *, offset: int = 0, limit: int = 5000
+    ) -> List[ModelType]:
+        """Get multiple objects with offset and limit."""
+        result = await db.scalars(
+            select(self.model).order_by(self.model.id).offset(offset).limit(limit)
+        )
+        return list(result.all())
+
+    async def aget_page(
+        self,
+        db: AsyncSession,
+        *,
+        order_by: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Page:
+        """Get one keyset page of objects and the cursor of the next one."""
+        query, column = self.keyset_query(order_by=order_by, cursor=cursor, limit=limit)
+        result = await db.scalars(query)
+        return self.build_page(list(result.all()), column, limit)
+
+    async def acreate(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        """Create a new object."""
+        if self.lean_writes:
+            row = (await db.execute(self.lean_insert_statement(obj_in))).one()
+            await db.commit()
+            db_obj: ModelType = self.from_row(row)
+            db.add(db_obj)
+            return db_obj
+
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj: ModelType = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aupdate(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        if_match: Optional[str] = None,
+    ) -> ModelType:
+        """
+        Update an object. `if_match` is the client's If-Match header, the update
+        fails with 412 when the row is no longer at the version it names.
+        """
+        version: Optional[int] = self.expected_version(db_obj, if_match)
+        if self.lean_writes:
+            if changes := self.lean_changes(db_obj, obj_in):
+                row = (
+                    await db.execute(
+                        self.lean_update_statement(db_obj, changes, version)
+                    )
+                ).one_or_none()
+                if row is None:
+                    await db.rollback()
+                    self.invalidate(inspect(db_obj).identity[0])
+                    if version is not None:
+                        raise precondition_failed()
+                    raise object_does_not_exist()
+                await db.commit()
+                self.populate(db_obj, row)
+                self.invalidate(inspect(db_obj).identity[0])
+            elif version is not None:
+                self.check_version(
+                    db_obj, await db.scalar(self.version_statement(db_obj)), version
+                )
+            return db_obj
+
+        obj_data: Any = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data: dict[str, Any] = obj_in.model_dump(exclude_unset=True)
+        if version is not None and not self.lean_changes(db_obj, update_data):
+            self.check_version(
+                db_obj, await db.scalar(self.version_statement(db_obj)), version
+            )
+        elif version is not None and version != db_obj.version:
+            self.invalidate(db_obj.id)
+            raise precondition_failed()
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        try:
+            await db.commit()
+        except StaleDataError:
+            await db.rollback()
+            self.invalidate(inspect(db_obj).identity[0])
+            raise precondition_failed()
+        self.invalidate(db_obj.id)
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aremove(self, db: AsyncSession, *, id: int) -> ModelType:
+        """Remove an object by its ID."""
+        db_obj: ModelType = await self.aget_or_404(db=db, id=id)
+        await db.delete(db_obj)
+        await db.commit()
+        self.invalidate(id)
+        return db_obj
+
+    async def ainsert_rows(
+        self,
+        db: AsyncSession,
+        rows: List[Dict[str, Any]],
+        *,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[ModelType]:
+        """Insert prepared rows with one multi-row ``INSERT ... RETURNING`` per chunk."""
+        db_objs: List[ModelType] = []
+        for chunk in self.chunked(rows, chunk_size):
+            result = await db.scalars(self.bulk_insert_statement(), chunk)
+            db_objs.extend(result)
+        if skipped := len(rows) - len(db_objs):
+            await db.rollback()
+            raise custom_exception(
+                detail=f"{skipped} of the {len(rows)} objects already exist."
+            )
+        await db.commit()
+        return db_objs
+
+    async def abulk_create(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[CreateSchemaType],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[ModelType]:
+        """Create many objects in a few round trips."""
+        rows = [jsonable_encoder(obj_in) for obj_in in objs_in]
+        return await self.ainsert_rows(db, rows, chunk_size=chunk_size)
+
+    async def abulk_update(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Dict[Any, Union[UpdateSchemaType, Dict[str, Any]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> int:
+        """Update many objects, keyed by ID, and return the number of rows changed."""
+        updated: int = 0
+        for chunk in self.chunked(list(objs_in.items()), chunk_size):
+            for statement in self.bulk_update_statements(dict(chunk)):
+                updated += (await db.execute(statement)).rowcount
+        await db.commit()
+        for id in objs_in:
+            self.invalidate(id)
+        return updated
+
+    async def abulk_remove(
+        self, db: AsyncSession, *, ids: List[Any], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> int:
+        """Remove many objects by ID and return the number of rows deleted."""
+        removed: int = 0
+        for chunk in self.chunked(ids, chunk_size):
+            result = await db.execute(
+                delete(self.model).where(self.model.id.in_(chunk))
+            )
+            removed += result.rowcount
+        await db.commit()
+        for id in ids:
+            self.invalidate(id)
+        return removed
+
+    async def astream(
+        self, db: AsyncSession, *, chunk_size: int = 1000
+    ) -> AsyncIterator[ModelType]:
+        """
+        Iterate over every object through a server-side cursor, only
+        `chunk_size` rows are fetched and held in memory at a time.
+        """
+        result = await db.stream_scalars(
+            select(self.model)
+            .order_by(self.model.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for db_obj in result:
+            yield db_obj
+
+    async def aexport(
+        self,
+        *,
+        schema: Type[BaseModel],
+        fmt: Literal["ndjson", "csv"] = "ndjson",
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[str]:
+        """
+        Serialise every object through `schema` as NDJSON or CSV lines. The
+        generator owns its session because it outlives the request dependencies.
+        """
+        async with AsyncSessionLocal() as db:
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=list(schema.model_fields))
+                writer.writeheader()
+                async for db_obj in self.astream(db, chunk_size=chunk_size):
+                    writer.writerow(
+                        schema.model_validate(db_obj).model_dump(mode="json")
+                    )
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                # Header only export still has to be flushed
+                if buffer.getvalue():
+                    yield buffer.getvalue()
+            else:
+                async for db_obj in self.astream(db, chunk_size=chunk_size):
+                    yield schema.model_validate(db_obj).model_dump_json() + "\n"
+
+    def export_response(
+        self,
+        *,
+        schema: Type[BaseModel],
+        fmt: Literal["ndjson", "csv"] = "ndjson",
+        chunk_size: int = 1000,
+    ) -> StreamingResponse:
+        """Stream the whole table as a download without materialising it."""
+        if fmt not in EXPORT_MEDIA_TYPES:
+            raise custom_exception(detail=f"Unsupported export format '{fmt}'.")
+        filename: str = f"{self.model.__tablename__}.{fmt}"
+        return StreamingResponse(
+            self.aexport(schema=schema, fmt=fmt, chunk_size=chunk_size),
+            media_type=EXPORT_MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud.base import CRUDBase
+from models.revoked_token import RevokedToken
+from schemas.revoked_token import RevokedTokenCreate, RevokedTokenUpdate
+
+
+class CRUDRevokedToken(CRUDBase[RevokedToken, RevokedTokenCreate, RevokedTokenUpdate]):
+    async def arevoke(self, db: AsyncSession, *, obj_in: RevokedTokenCreate) -> None:
+        """Record a revoked token id, revoking it twice is a no-op."""
+        await db.execute(
+            insert(RevokedToken)
+            .values(**obj_in.model_dump())
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        await db.commit()
+
+    async def ais_revoked(self, db: AsyncSession, *, jti: str) -> bool:
+        return (
+            await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti))
+        ) is not None
+
+    async def aget_jtis_since(
+        self, db: AsyncSession, *, since: Optional[datetime] = None
+    ) -> List[tuple[datetime, str]]:
+        """
+        Revocation times and jtis of unexpired revocations recorded at or
+        after `since`, all of them when it is None, oldest first.
+        """
+        statement = select(RevokedToken.revoked_at, RevokedToken.jti).where(
+            RevokedToken.expires_at > datetime.now(timezone.utc)
+        )
+        if since is not None:
+            statement = statement.where(RevokedToken.revoked_at >= since)
+        rows = await db.execute(statement.order_by(RevokedToken.revoked_at))
+        return [tuple(row) for row in rows]
+
+    async def aprune(self, db: AsyncSession) -> int:
+        """Delete revocations of tokens that have expired, returns the count."""
+        result = await db.execute(
+            delete(RevokedToken).where(
+                RevokedToken.expires_at <= datetime.now(timezone.utc)
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+
+crud_revoked_token = CRUDRevokedToken(RevokedToken)
@@ -0,0 +1,194 @@
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from crud.base import CRUDBase
+from core.config import settings
+from models.stored_file import DELETING, PENDING, READY, StoredFile
+from schemas.stored_file import StoredFileCreate, StoredFileUpdate
+
+
+class CRUDStoredFile(CRUDBase[StoredFile, StoredFileCreate, StoredFileUpdate]):
+    async def aget_by_object_key(
+        self, db: AsyncSession, *, object_key: str
+    ) -> Optional[StoredFile]:
+        """Get a stored file by the key of its object in the bucket."""
+        return await db.scalar(
+            select(StoredFile).where(StoredFile.object_key == object_key)
+        )
+
+    async def aacquire(
+        self, db: AsyncSession, *, obj_in: StoredFileCreate
+    ) -> tuple[StoredFile, bool]:
+        """
+        Take a reference to the file with this content hash in one short
+        transaction. Returns the row and whether the caller claimed its
+        upload, i.e. whether it has to process and upload the content and then
+        call `amark_ready`. A row that is still pending is uploaded by someone
+        else and a deleting one is handed back as pending once its objects are
+        gone, see `aclaim` for taking the upload over.
+        """
+        statement = (
+            insert(StoredFile)
+            .values(
+                **obj_in.model_dump(),
+                ref_count=1,
+                status=PENDING,
+                claimed_at=func.now(),
+            )
+            .on_conflict_do_update(
+                index_elements=[StoredFile.hash],
+                set_={"ref_count": StoredFile.ref_count + 1},
+            )
+            # xmax is only zero for a freshly inserted row version
+            .returning(StoredFile, literal_column("xmax = 0"))
+        )
+        db_obj, created = (await db.execute(statement)).one()
+        await db.commit()
+        return db_obj, created
+
+    async def aclaim(self, db: AsyncSession, *, id: int) -> bool:
+        """
+        Claim the upload of a pending file whose claim was given up or went
+        stale. A deleting file whose removal went stale is taken over as well.
+        """
+        claimed: Optional[int] = await db.scalar(
+            update(StoredFile)
+            .where(
+                StoredFile.id == id,
+                StoredFile.status.in_([PENDING, DELETING]),
+                or_(
+                    StoredFile.claimed_at.is_(None),
+                    StoredFile.claimed_at
+                    < func.now() - timedelta(seconds=settings.upload_claim_timeout),
+                ),
+            )
+            .values(status=PENDING, claimed_at=func.now())
+            .returning(StoredFile.id)
+        )
+        await db.commit()
+        return claimed is not None
+
+    async def amark_ready(
+        self,
+        db: AsyncSession,
+        *,
+        id: int,
+        size: int,
+        width: Optional[int],
+        height: Optional[int],
+        variants: Optional[Dict[str, List[int]]] = None,
+    ) -> None:
+        """Record a finished upload, callers waiting on the file can use it now."""
+        await db.execute(
+            update(StoredFile)
+            .where(StoredFile.id == id)
+            .values(
+                status=READY, size=size, width=width, height=height, variants=variants
+            )
+        )
+        await db.commit()
+
+    async def aabandon(self, db: AsyncSession, *, id: int, claimed: bool) -> None:
+        """
+        Drop the reference of a caller whose upload failed or who stopped
+        waiting for one. A claimed upload is given up, so a caller waiting on
+        the same content takes it over. A pending row nobody references is
+        removed, nothing was stored for it.
+        """
+        values: dict = {"ref_count": StoredFile.ref_count - 1}
+        if claimed:
+            values["claimed_at"] = None
+        ref_count: Optional[int] = await db.scalar(
+            update(StoredFile)
+            .where(StoredFile.id == id)
+            .values(**values)
+            .returning(StoredFile.ref_count)
+        )
+        if ref_count is not None and ref_count <= 0:
+            await db.execute(
+                delete(StoredFile).where(
+                    StoredFile.id == id,
+                    StoredFile.status == PENDING,
+                    StoredFile.ref_count <= 0,
+                )
+            )
+        await db.commit()
+
+    def release(
+        self, db: Session, *, object_keys: List[str]
+    ) -> Dict[str, Optional[bool]]:
+        """
+        Drop one reference to each file stored under `object_keys` in a single
+        UPDATE. Returns per key whether the object is no longer used, None
+        when it is not tracked. Unused files are marked deleting rather than
+        removed, `settle` finishes them once the delete requests are done.
+        """
+        rows = db.execute(
+            update(StoredFile)
+            .where(StoredFile.object_key.in_(set(object_keys)))
+            .values(
+                ref_count=StoredFile.ref_count - 1,
+                status=case(
+                    (StoredFile.ref_count <= 1, DELETING), else_=StoredFile.status
+                ),
+                claimed_at=case(
+                    (StoredFile.ref_count <= 1, func.now()),
+                    else_=StoredFile.claimed_at,
+                ),
+            )
+            .returning(StoredFile.object_key, StoredFile.ref_count)
+        ).all()
+        db.commit()
+        released: Dict[str, Optional[bool]] = dict.fromkeys(object_keys)
+        released.update({object_key: ref_count <= 0 for object_key, ref_count in rows})
+        return released
+
+    def settle(
+        self, db: Session, *, deleted: List[str], failed: Dict[str, bool]
+    ) -> None:
+        """
+        Finish releasing files once their delete requests are done. Deleted
+        files acquired again meanwhile are handed back as pending, so whoever
+        waits on them uploads them anew now that the delete can no longer
+        remove them. Files in `failed` get their reference back for a retry,
+        mapped to whether the object itself is still stored.
+        """
+        is_deleting = StoredFile.status == DELETING
+        db.execute(
+            update(StoredFile)
+            .where(
+                StoredFile.object_key.in_(set(deleted)),
+                is_deleting,
+                StoredFile.ref_count > 0,
+            )
+            .values(status=PENDING, claimed_at=None)
+        )
+        db.execute(
+            delete(StoredFile).where(
+                StoredFile.object_key.in_(set(deleted)),
+                is_deleting,
+                StoredFile.ref_count <= 0,
+            )
+        )
+        for stored in (True, False):
+            object_keys: List[str] = [k for k, v in failed.items() if v is stored]
+            if not object_keys:
+                continue
+            db.execute(
+                update(StoredFile)
+                .where(StoredFile.object_key.in_(object_keys), is_deleting)
+                .values(
+                    ref_count=StoredFile.ref_count + 1,
+                    status=READY if stored else PENDING,
+                    claimed_at=StoredFile.claimed_at if stored else None,
+                )
+            )
+        db.commit()
+
+
+crud_stored_file = CRUDStoredFile(StoredFile)
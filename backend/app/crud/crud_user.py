@@ -1,18 +1,49 @@
-from typing import Any, Optional
+from typing import Any, List, Optional
 
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from core.exceptions import object_does_not_exist
-from crud.base import CRUDBase
+from core.cache import user_cache
+from core.exceptions import object_does_not_exist, user_username_exists
+from core.workers import hashing_pool
+from crud.base import BULK_CHUNK_SIZE, CRUDBase
 from models.user import User
 from schemas.user import UserCreate, UserUpdate
-from core.auth import get_password_hash
+from core.auth import aget_password_hash, get_password_hash
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    @staticmethod
+    def email_matches(email: str) -> Any:
+        """Case-insensitive email filter served by the unique lower(email) index."""
+        return func.lower(User.email) == func.lower(email)
+
+    @staticmethod
+    def signup_statement(create_data: dict[str, Any]) -> Any:
+        """
+        Insert a user in one round trip, an email that is already taken (in any
+        letter case) inserts nothing and returns no row.
+        """
+        return (
+            insert(User)
+            .values(**create_data)
+            .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+            .returning(User)
+        )
+
+    def bulk_insert_statement(self) -> Any:
+        """Emails already taken are skipped, the bulk insert then fails as a whole."""
+        return (
+            insert(User)
+            .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+            .returning(User)
+        )
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         """Get a user by their email address."""
-        if result := db.query(User).filter(User.email == email).first():
+        if result := db.query(User).filter(self.email_matches(email)).first():
             return result
         raise object_does_not_exist()
 
@@ -20,12 +51,74 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Create a new user."""
         create_data: dict[str, Any] = obj_in.model_dump()
         create_data.pop("password")
-        db_obj: User = User(**create_data)
-        db_obj.hashed_password = get_password_hash(obj_in.password)
-        db.add(db_obj)
+        create_data["hashed_password"] = get_password_hash(obj_in.password)
+        db_obj: Optional[User] = db.scalar(self.signup_statement(create_data))
+        if db_obj is None:
+            db.rollback()
+            raise user_username_exists()
         db.commit()
 
         return db_obj
 
+    async def aget_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        """Get a user by their email address without blocking the event loop."""
+        if result := await db.scalar(select(User).where(self.email_matches(email))):
+            return result
+        raise object_does_not_exist()
+
+    async def acreate(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        """Create a new user, hashing the password in the hashing pool."""
+        create_data: dict[str, Any] = obj_in.model_dump()
+        create_data.pop("password")
+        create_data["hashed_password"] = await aget_password_hash(obj_in.password)
+        db_obj: Optional[User] = await db.scalar(self.signup_statement(create_data))
+        if db_obj is None:
+            await db.rollback()
+            raise user_username_exists()
+        await db.commit()
+
+        return db_obj
+
+    @staticmethod
+    def bulk_rows(
+        objs_in: List[UserCreate], hashed_passwords: List[str]
+    ) -> List[dict[str, Any]]:
+        rows: List[dict[str, Any]] = []
+        for obj_in, hashed_password in zip(objs_in, hashed_passwords):
+            row: dict[str, Any] = obj_in.model_dump(exclude={"password"})
+            row["hashed_password"] = hashed_password
+            rows.append(row)
+        return rows
+
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[UserCreate],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[User]:
+        """Create many users, hashing their passwords in parallel worker processes."""
+        hashed_passwords: List[str] = hashing_pool.map_sync(
+            get_password_hash, [obj_in.password for obj_in in objs_in]
+        )
+        return self.insert_rows(
+            db, self.bulk_rows(objs_in, hashed_passwords), chunk_size=chunk_size
+        )
+
+    async def abulk_create(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: List[UserCreate],
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[User]:
+        """Create many users, hashing their passwords in parallel worker processes."""
+        hashed_passwords: List[str] = await hashing_pool.map(
+            get_password_hash, [obj_in.password for obj_in in objs_in]
+        )
+        return await self.ainsert_rows(
+            db, self.bulk_rows(objs_in, hashed_passwords), chunk_size=chunk_size
+        )
+
 
-crud_user = CRUDUser(User)
+crud_user = CRUDUser(User, cache=user_cache, lean_writes=True, sortable=("id", "email"))
@@ -2,3 +2,5 @@
 # imported by Alembic
 from db.base_class import Base  # noqa
 from models.user import User  # noqa
+from models.stored_file import StoredFile  # noqa
+from models.revoked_token import RevokedToken  # noqa
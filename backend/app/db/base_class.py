@@ -1,5 +1,6 @@
 import typing as t
 
+from sqlalchemy import Column, Integer, text
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 
 
@@ -15,3 +16,18 @@ class Base:
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
+
+
+class Versioned:
+    """
+    Opt-in row version for models, mixed in before Base. SQLAlchemy bumps it
+    on every UPDATE and adds it to the WHERE clause (`version_id_col`), so a
+    row changed since it was loaded raises StaleDataError instead of being
+    overwritten. Read endpoints derive ETags from it.
+    """
+
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    @declared_attr
+    def __mapper_args__(cls) -> dict[str, t.Any]:
+        return {"version_id_col": cls.version}
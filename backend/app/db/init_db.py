@@ -0,0 +1,28 @@
+"""
+Create missing tables straight from the models, for throwaway databases such
+as tests. Real databases are migrated with `alembic upgrade head`; one set up
+here has to be marked current with `alembic stamp head` before migrating.
+
+Usage (from the app directory):
+    python -m db.init_db
+
+The app does the same on startup when DB_CREATE_ALL=true.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from db.base import Base
+from db.session import async_engine, engine
+
+
+def init_db() -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+async def ainit_db(engine: AsyncEngine = async_engine) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+if __name__ == "__main__":
+    init_db()
@@ -0,0 +1,114 @@
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+from core.config import settings
+
+
+class CheckoutTimingMixin:
+    """
+    Records how long callers waited for a connection to be checked out.
+    Wraps the public `Pool.connect`, which every engine checkout goes through.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.checkouts: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+        self.overflow_connections: int = 0
+        self.invalidations: int = 0
+
+    def connect(self) -> Any:
+        started: float = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited: float = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+class InstrumentedQueuePool(CheckoutTimingMixin, QueuePool): ...
+
+
+class InstrumentedAsyncQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool): ...
+
+
+def engine_options(is_async: bool = False) -> dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine from the environment."""
+    connect_args: dict[str, Any] = {}
+    if settings.db_pgbouncer:
+        options: dict[str, Any] = {"poolclass": NullPool}
+        if is_async:
+            # pgbouncer cannot route server-side prepared statements between clients
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+        # Startup options are rejected by pgbouncer, set statement_timeout on the role
+        options["connect_args"] = connect_args
+        return options
+
+    if settings.db_statement_timeout_ms:
+        if is_async:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(settings.db_statement_timeout_ms)
+            }
+        else:
+            connect_args["options"] = (
+                f"-c statement_timeout={settings.db_statement_timeout_ms}"
+            )
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def instrument(engine: Engine) -> Engine:
+    """Hook pool events that are not visible from the pool status methods."""
+
+    @event.listens_for(engine, "connect")
+    def count_overflow(dbapi_connection: Any, record: Any) -> None:
+        # The pool counts a connection before opening it, overflow > 0 means it
+        # is one of the connections opened past pool_size
+        pool: Pool = engine.pool
+        if isinstance(pool, CheckoutTimingMixin) and pool.overflow() > 0:
+            pool.overflow_connections += 1
+
+    @event.listens_for(engine, "invalidate")
+    def count_invalidation(dbapi_connection: Any, record: Any, exception: Any) -> None:
+        pool: Pool = engine.pool
+        if isinstance(pool, CheckoutTimingMixin):
+            pool.invalidations += 1
+
+    return engine
+
+
+def pool_stats(engine: Engine) -> dict[str, Any]:
+    """Snapshot of connection usage and checkout wait times of an engine's pool."""
+    pool: Pool = engine.pool
+    if not isinstance(pool, CheckoutTimingMixin):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        "checkouts": pool.checkouts,
+        "overflow_connections": pool.overflow_connections,
+        "invalidations": pool.invalidations,
+        "avg_wait_ms": (
+            round(pool.wait_total / pool.checkouts * 1000, 2) if pool.checkouts else 0.0
+        ),
+        "max_wait_ms": round(pool.wait_max * 1000, 2),
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import (
+    Delete,
+    Engine,
+    Insert,
+    Select,
+    Update,
+    create_engine,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session
+
+from core.cache import CacheBackend, TTLCache
+from core.config import settings
+from db.pool import engine_options
+
+logger = logging.getLogger(__name__)
+
+# Set by the middleware to the client's signed primary pin
+PRIMARY_COOKIE: str = "db_primary_until"
+
+# Authenticated subjects that wrote within the sticky window
+recent_writers: CacheBackend = TTLCache(
+    maxsize=10000, ttl=settings.db_replica_sticky_seconds
+)
+
+
+def pin_signature(expiry: str) -> Optional[str]:
+    key: Optional[str] = settings.db_replica_sticky_secret or settings.token_secret
+    if not key:
+        return None
+    return hmac.new(key.encode(), expiry.encode(), hashlib.sha256).hexdigest()
+
+
+class ReadYourWrites:
+    """
+    Read-your-writes state of one request. A write pins the client to the
+    primary in two ways:
+    - its authenticated subject is kept in `recent_writers`, which needs
+      nothing from the client but only holds on this worker
+    - a signed cookie holds the pin's expiry, so it holds on every worker,
+      for clients that send credentials (a cross-origin SPA needs
+      `credentials: "include"` and an explicit CORS origin)
+    """
+
+    def __init__(self, primary_until: float = 0.0):
+        self.primary_until: float = primary_until
+        self.subject: Optional[str] = None
+        self.wrote: bool = False
+
+    @classmethod
+    def from_cookie(cls, value: Optional[str]) -> "ReadYourWrites":
+        """State of a cookie, ignored unless signed by us and never past the window."""
+        expiry, _, signature = (value or "").partition(".")
+        expected: Optional[str] = pin_signature(expiry)
+        if expected is None or not hmac.compare_digest(signature, expected):
+            return cls()
+        try:
+            primary_until: float = float(expiry)
+        except ValueError:
+            return cls()
+        return cls(min(primary_until, time.time() + settings.db_replica_sticky_seconds))
+
+    def is_sticky(self) -> bool:
+        return (
+            self.wrote
+            or self.primary_until > time.time()
+            or (
+                self.subject is not None
+                and recent_writers.get(self.subject) is not None
+            )
+        )
+
+    def remember(self) -> Optional[str]:
+        """
+        Record a write at the end of the request. Returns the new cookie
+        value, None when the pin is unchanged or cookies cannot be signed.
+        """
+        if not self.wrote:
+            return None
+        if self.subject is not None:
+            recent_writers.set(self.subject, True)
+        expiry: str = str(int(time.time() + settings.db_replica_sticky_seconds))
+        if (signature := pin_signature(expiry)) is None:
+            return None
+        return f"{expiry}.{signature}"
+
+
+read_your_writes: ContextVar[Optional[ReadYourWrites]] = ContextVar(
+    "read_your_writes", default=None
+)
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """
+    Sends plain SELECTs to healthy replicas and everything else to the primary.
+    A client that just wrote keeps reading from the primary for
+    `DB_REPLICA_STICKY_SECONDS` so it sees its own writes, see `ReadYourWrites`.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        async_primary: AsyncEngine,
+        replica_urls: list[str],
+        async_replica_urls: list[str],
+    ):
+        self.primary: Engine = primary
+        self.async_primary: AsyncEngine = async_primary
+        self.replicas: list[Engine] = [
+            create_engine(url, **engine_options()) for url in replica_urls
+        ]
+        self.async_replicas: list[AsyncEngine] = [
+            create_async_engine(url, **engine_options(is_async=True))
+            for url in async_replica_urls
+        ]
+        self.healthy: list[bool] = [True] * len(self.replicas)
+        self.lag: list[Optional[float]] = [None] * len(self.replicas)
+        self._next = itertools.count()
+
+    def session_class(self, is_async: bool = False) -> type["RoutingSession"]:
+        return type(
+            "RoutingSession", (RoutingSession,), {"router": self, "is_async": is_async}
+        )
+
+    def mark_write(self) -> None:
+        if (state := read_your_writes.get()) is not None:
+            state.wrote = True
+
+    def is_sticky(self) -> bool:
+        state: Optional[ReadYourWrites] = read_your_writes.get()
+        return state is not None and state.is_sticky()
+
+    def replica(self, is_async: bool) -> Optional[Engine]:
+        """Round-robin over healthy replicas, None when none is usable."""
+        candidates: list[int] = [i for i, ok in enumerate(self.healthy) if ok]
+        if not candidates:
+            return None
+        index: int = candidates[next(self._next) % len(candidates)]
+        if is_async:
+            return self.async_replicas[index].sync_engine
+        return self.replicas[index]
+
+    def primary_bind(self, is_async: bool) -> Engine:
+        return self.async_primary.sync_engine if is_async else self.primary
+
+    async def check_replicas(self) -> None:
+        """Drop replicas that are unreachable or lag behind more than allowed."""
+        for index, replica in enumerate(self.async_replicas):
+            try:
+                async with replica.connect() as connection:
+                    lag = float(await connection.scalar(REPLICA_LAG_QUERY))
+            except Exception as e:
+                logger.warning(f"Replica {index} is unreachable: {e}")
+                self.lag[index] = None
+                self.healthy[index] = False
+                continue
+            self.lag[index] = lag
+            self.healthy[index] = lag <= settings.db_replica_max_lag_seconds
+
+    async def monitor(self) -> None:
+        while self.async_replicas:
+            await self.check_replicas()
+            await asyncio.sleep(settings.db_replica_check_interval)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "replicas": [
+                {"healthy": healthy, "lag_seconds": lag}
+                for healthy, lag in zip(self.healthy, self.lag)
+            ]
+        }
+
+
+class RoutingSession(Session):
+    router: ReplicaRouter
+    is_async: bool = False
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Engine:
+        """Pick the engine per statement, see `ReplicaRouter`."""
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            # Later reads in this session and of this client must see the write
+            self.info["primary"] = True
+            self.router.mark_write()
+            return self.router.primary_bind(self.is_async)
+        is_plain_select: bool = (
+            isinstance(clause, Select) and clause._for_update_arg is None
+        )
+        if not is_plain_select or self.info.get("primary") or self.router.is_sticky():
+            return self.router.primary_bind(self.is_async)
+        return self.router.replica(self.is_async) or self.router.primary_bind(
+            self.is_async
+        )
@@ -1,19 +1,50 @@
-import os
-from typing import TYPE_CHECKING
-
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-if TYPE_CHECKING:
-    from sqlalchemy import Engine
+from core.config import settings
+from db.pool import engine_options, instrument
+from db.routing import ReplicaRouter
+
+
+def get_async_database_url(url: str) -> str:
+    """Swap the sync postgres driver in the URL for asyncpg."""
+    scheme, _, rest = url.partition("://")
+    return f"{scheme.split('+')[0]}+asyncpg://{rest}"
+
 
-load_dotenv()
+SQLALCHEMY_DATABASE_URL: str = settings.database_url
+ASYNC_SQLALCHEMY_DATABASE_URL: str = (
+    settings.async_database_url or get_async_database_url(SQLALCHEMY_DATABASE_URL)
+)
 
-SQLALCHEMY_DATABASE_URL: str = os.getenv("DATABASE_URL")
+# Sync engine is kept for Alembic, scripts and the remaining sync endpoints
+engine: Engine = instrument(create_engine(SQLALCHEMY_DATABASE_URL, **engine_options()))
+async_engine: AsyncEngine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, **engine_options(is_async=True)
+)
+instrument(async_engine.sync_engine)
 
-engine: Engine = create_engine(SQLALCHEMY_DATABASE_URL)
+replica_router = ReplicaRouter(
+    primary=engine,
+    async_primary=async_engine,
+    replica_urls=list(settings.database_replica_urls),
+    async_replica_urls=[
+        get_async_database_url(url) for url in settings.database_replica_urls
+    ],
+)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=replica_router.session_class(),
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=replica_router.session_class(is_async=True),
+    autoflush=False,
+    expire_on_commit=False,
+)
 Base = declarative_base()
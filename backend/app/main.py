@@ -1,13 +1,27 @@
+import asyncio
+import math
+
 from api.api_v1.routers import api_router
-from db.base import Base
-from db.session import engine
+from core.config import settings
+from db.init_db import ainit_db
+from db.routing import PRIMARY_COOKIE, ReadYourWrites, read_your_writes
+from db.session import replica_router
+from core.email import email_templates, email_worker
+from core.images import async_storage_client
+from core.media import media_files
+from core.revocation import revocation_list
+from core.workers import hashing_pool, image_pool
 from fastapi import APIRouter
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="FastApi-React", debug=False)
+app = FastAPI(title="FastApi-React", debug=False, default_response_class=ORJSONResponse)
 
+# The signed db_primary_until cookie (see db.routing.ReadYourWrites) only
+# reaches cross-origin clients that send credentials. Browsers do not send
+# them to a wildcard origin, list the frontend's origins here for that.
 origins = ["*"]
 
 app.add_middleware(
@@ -18,12 +32,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def bind_read_your_writes(request: Request, call_next):
+    # Reads of a client that just wrote are pinned to the primary database
+    state = ReadYourWrites.from_cookie(request.cookies.get(PRIMARY_COOKIE))
+    token = read_your_writes.set(state)
+    try:
+        response = await call_next(request)
+    finally:
+        read_your_writes.reset(token)
+    if cookie := state.remember():
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            cookie,
+            max_age=math.ceil(settings.db_replica_sticky_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
 root_router = APIRouter()
 app.include_router(api_router, prefix="/api")
 app.include_router(root_router)
 
-Base.metadata.create_all(bind=engine)
-app.mount("/media", StaticFiles(directory="media"), name="static")
+app.mount("/media", media_files, name="static")
+
+
+@app.on_event("startup")
+async def create_schema() -> None:
+    # Runs before the other startup hooks, some of them read tables
+    if settings.db_create_all:
+        await ainit_db()
+
+
+@app.on_event("startup")
+async def monitor_replicas() -> None:
+    app.state.replica_monitor = asyncio.create_task(replica_router.monitor())
+
+
+@app.on_event("startup")
+async def load_revoked_tokens() -> None:
+    await revocation_list.rebuild()
+    app.state.revocation_monitor = asyncio.create_task(revocation_list.monitor())
+
+
+@app.on_event("startup")
+async def start_email_delivery() -> None:
+    email_templates.precompile()
+    email_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_worker_pools() -> None:
+    hashing_pool.shutdown()
+    image_pool.shutdown()
+    app.state.replica_monitor.cancel()
+    app.state.revocation_monitor.cancel()
+    await async_storage_client.close()
+    await email_worker.stop()
 
 
 @app.get("/", status_code=200)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from db.base_class import Base
+
+
+class RevokedToken(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(32), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=True)
+    # Rows are pruned once the token would have expired anyway
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    revoked_at = Column(
+        DateTime(timezone=True), server_default=func.now(), index=True, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the revoked token."""
+        return f"<RevokedToken(id={self.id}, jti={self.jti})>"
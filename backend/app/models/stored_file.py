@@ -0,0 +1,32 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Integer, String, func
+
+from db.base_class import Base
+
+# Life cycle of a stored file: its content is uploaded while pending and
+# removed from the bucket while deleting, the row goes once that succeeded
+PENDING: str = "pending"
+READY: str = "ready"
+DELETING: str = "deleting"
+
+
+class StoredFile(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    hash = Column(String(64), unique=True, nullable=False)
+    object_key = Column(String, index=True, nullable=False)
+    content_type = Column(String(256), nullable=True)
+    size = Column(BigInteger, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Number of places using this object, it is deleted once it drops to zero
+    ref_count = Column(Integer, nullable=False, default=1)
+    # Widths of the pre-rendered variants by format, as they were uploaded
+    variants = Column(JSON, nullable=True)
+    status = Column(String(16), nullable=False, server_default=PENDING)
+    # When the upload of a pending file was claimed, NULL once given up
+    claimed_at = Column(
+        DateTime(timezone=True), nullable=True, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the stored file."""
+        return f"<StoredFile(id={self.id}, object_key={self.object_key})>"
@@ -1,17 +1,20 @@
-from sqlalchemy import Integer, String, Column, Boolean
+from sqlalchemy import Integer, String, Column, Boolean, Index, false, func
 
-from db.base_class import Base
+from db.base_class import Base, Versioned
 
 
-class User(Base):
+class User(Versioned, Base):
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(256), nullable=True)
     surname = Column(String(256), nullable=True)
-    email = Column(String, index=True, nullable=False)
-    is_admin = Column(Boolean, default=False)
+    email = Column(String, nullable=False)
+    is_admin = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     hashed_password = Column(String, nullable=False)
 
+    # Emails are unique regardless of letter case, lookups filter on lower(email)
+    __table_args__ = (Index("ix_user_email_lower", func.lower(email), unique=True),)
+
     def __repr__(self) -> str:
         """Return a string representation of the user."""
         return f"<User(id={self.id}, email={self.email})>"
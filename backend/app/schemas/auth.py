@@ -1,6 +1,11 @@
 from pydantic import BaseModel
 
+from core.serializers import ORMSerializer
+
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+
+token_serializer = ORMSerializer(Token)
@@ -0,0 +1,11 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+ItemType = TypeVar("ItemType")
+
+
+# Keyset paginated result, pass `next_cursor` back to get the following page
+class Page(BaseModel, Generic[ItemType]):
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+# Properties to receive on creation
+class RevokedTokenCreate(BaseModel):
+    jti: str
+    user_id: Optional[int] = None
+    expires_at: datetime
+
+
+# Revocations are never updated
+class RevokedTokenUpdate(BaseModel): ...
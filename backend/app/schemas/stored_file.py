@@ -0,0 +1,31 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StoredFileBase(BaseModel):
+    object_key: str
+    content_type: Optional[str] = None
+    size: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+# Properties to receive on creation
+class StoredFileCreate(StoredFileBase):
+    hash: str
+
+
+# Properties to receive on update
+class StoredFileUpdate(BaseModel):
+    size: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class StoredFileInDB(StoredFileCreate):
+    id: int
+    ref_count: int
+
+    class Config:
+        from_attributes = True
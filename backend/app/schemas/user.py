@@ -2,6 +2,8 @@ from typing import Optional
 
 from pydantic import BaseModel, EmailStr
 
+from core.serializers import ORMSerializer
+
 
 class UserBase(BaseModel):
     first_name: Optional[str]
@@ -26,3 +28,7 @@ class UserInDB(UserBase):
 
     class Config:
         from_attributes = True
+
+
+# Built once, for endpoints returning users straight from the database
+user_serializer = ORMSerializer(UserInDB)
@@ -1,11 +1,13 @@
 import os
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from main import app
 from db.base_class import Base
-from api.deps import get_db
+from api.deps import get_async_db, get_db
+from db.session import get_async_database_url
 
 # Create a test database URL for PostgreSQL
 TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
@@ -46,8 +48,25 @@ def override_get_db(db_session):
     app.dependency_overrides.pop(get_db, None)
 
 
+# Override FastAPI's get_async_db dependency
+@pytest.fixture(scope="class")
+def override_get_async_db(db_engine):
+    async_engine = create_async_engine(get_async_database_url(TEST_DATABASE_URL))
+    AsyncTestingSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+    async def _get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = _get_async_db
+    yield
+    app.dependency_overrides.pop(get_async_db, None)
+
+
 # Fixture for TestClient
 @pytest.fixture(scope="class")
-def client(override_get_db):
+def client(override_get_db, override_get_async_db):
     with TestClient(app) as test_client:
         yield test_client
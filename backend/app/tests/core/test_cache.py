@@ -0,0 +1,24 @@
+import os
+
+from core.cache import DiskLRUCache
+
+
+def test_disk_cache_is_lazy_and_tracks_its_size(tmp_path):
+    directory: str = str(tmp_path / "images")
+    cache = DiskLRUCache(directory, max_bytes=1000, grace_seconds=0)
+    assert not os.path.exists(directory)
+
+    for i in range(10):
+        cache.set(str(i), b"x" * 100)
+        os.utime(cache.path(str(i)), (i, i))
+    assert cache.stats()["bytes"] == 1000
+
+    # Replacing a file only counts the difference
+    cache.set("9", b"x" * 50)
+    assert cache.stats()["bytes"] == 950
+
+    # Going over budget scans and evicts the oldest down to the low water mark
+    cache.set("10", b"x" * 100)
+    assert cache.stats()["bytes"] <= cache.low_water
+    assert cache.get("0") is None
+    assert cache.get("10") is not None
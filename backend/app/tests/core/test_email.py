@@ -0,0 +1,163 @@
+import asyncio
+import dataclasses
+import os
+import socket
+import time
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import core.email
+from core.email import EmailDeliveryWorker, EmailTemplates, QueuedEmail
+
+TEMPLATE_DIR: str = os.path.join(
+    os.path.dirname(__file__), "..", "..", "templates", "email"
+)
+
+
+class RecordingHandler:
+    """Accepts mail, refuses `refused` for good and `flaky` once."""
+
+    def __init__(self):
+        self.refused: set[str] = set()
+        self.flaky: set[str] = set()
+        self.delivered: list[str] = []
+        self.seen_at: dict[str, float] = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        self.seen_at.setdefault(address, time.monotonic())
+        if address in self.flaky:
+            self.flaky.discard(address)
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        self.seen_at.update(dict.fromkeys(envelope.rcpt_tos, time.monotonic()))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_handler(monkeypatch):
+    monkeypatch.setattr(
+        core.email,
+        "settings",
+        dataclasses.replace(
+            core.email.settings,
+            mail_worker_rate_per_second=1000,
+            mail_retry_base_delay=0.2,
+            mail_max_retries=3,
+        ),
+    )
+    handler = RecordingHandler()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        handler.port = probe.getsockname()[1]
+    controller = Controller(handler, hostname="127.0.0.1", port=handler.port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+
+def message(to: str) -> EmailMessage:
+    email = EmailMessage()
+    email["From"] = "app@example.com"
+    email["To"] = to
+    email["Subject"] = "Test"
+    email.set_content("Hello")
+    return email
+
+
+async def deliver(handler: RecordingHandler, recipients: list[str]) -> dict:
+    worker = EmailDeliveryWorker()
+    worker.hostname, worker.port = "127.0.0.1", handler.port
+    worker.start()
+    for to in recipients:
+        worker.enqueue(message(to))
+    # Retries are on timers, so an empty queue does not mean everything is done
+    while (
+        worker.queue.qsize() or worker._retry_timers or worker.queue._unfinished_tasks
+    ):
+        await asyncio.sleep(0.01)
+    await worker.stop()
+    return worker.stats()
+
+
+def test_messages_are_delivered(smtp_handler):
+    stats = asyncio.run(deliver(smtp_handler, ["a@example.com", "b@example.com"]))
+
+    assert smtp_handler.delivered == ["a@example.com", "b@example.com"]
+    assert stats["sent"] == 2
+    assert stats["failed"] == stats["retries"] == 0
+
+
+def test_permanent_refusal_is_not_retried(smtp_handler):
+    smtp_handler.refused.add("gone@example.com")
+
+    stats = asyncio.run(deliver(smtp_handler, ["gone@example.com", "b@example.com"]))
+
+    assert smtp_handler.delivered == ["b@example.com"]
+    assert stats["failed"] == 1
+    assert stats["retries"] == 0
+
+
+def test_temporary_failure_is_retried_without_holding_up_the_queue(smtp_handler):
+    smtp_handler.flaky.add("slow@example.com")
+
+    stats = asyncio.run(deliver(smtp_handler, ["slow@example.com", "b@example.com"]))
+
+    # The message behind the failed one went out without waiting for the backoff
+    assert smtp_handler.delivered == ["b@example.com", "slow@example.com"]
+    waited = (
+        smtp_handler.seen_at["b@example.com"] - smtp_handler.seen_at["slow@example.com"]
+    )
+    assert waited < core.email.settings.mail_retry_base_delay / 2
+    assert stats["retries"] == 1
+    assert stats["sent"] == 2
+    assert stats["failed"] == 0
+
+
+def test_retry_into_a_full_queue_is_dropped(smtp_handler):
+    async def requeue_into_full_queue() -> dict:
+        worker = EmailDeliveryWorker()
+        worker.queue = asyncio.Queue(maxsize=1)
+        worker.enqueue(message("a@example.com"))
+        worker.retry_later(QueuedEmail(message("b@example.com")), OSError("reset"))
+        await asyncio.sleep(0.3)
+        return worker.stats()
+
+    stats = asyncio.run(requeue_into_full_queue())
+
+    assert stats["dropped"] == 1
+    assert stats["retry_pending"] == 0
+    assert stats["queue_depth"] == 1
+
+
+def test_render_many_matches_rendering_each_recipient():
+    templates = EmailTemplates(
+        Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=select_autoescape(["html"]),
+        )
+    )
+    shared: dict = {"title": "News", "body": "Something <new>"}
+    recipients: list[dict] = [{"name": "Ann"}, {"name": "<Bob>"}]
+
+    # Twice, the second call renders from the cached shell
+    for _ in range(2):
+        bodies: list[str] = templates.render_many(
+            "announcement.html", shared, recipients
+        )
+
+        assert bodies == [
+            templates.get("announcement.html").render(**shared, **recipient)
+            for recipient in recipients
+        ]
+    # The greeting is set at top level and used inside the recipient block
+    assert "Hello Ann," in bodies[0]
+    assert "Hello &lt;Bob&gt;," in bodies[1]
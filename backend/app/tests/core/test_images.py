@@ -0,0 +1,54 @@
+from io import BytesIO
+
+from PIL import Image
+
+from core.images import EXIF_ORIENTATION, ImageHandler, render_width, resize_image
+from models.stored_file import StoredFile
+
+
+def rotated_jpeg(width: int, height: int) -> bytes:
+    """A JPEG stored `width` x `height` that displays rotated by 90 degrees."""
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "red").save(
+        buffer, format="JPEG", exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+def test_render_width_of_a_rotated_jpeg():
+    content: bytes = render_width(rotated_jpeg(400, 200), 100, "png")
+
+    with Image.open(BytesIO(content)) as img:
+        assert img.size == (100, 200)
+
+
+def test_resize_rotated_jpeg_and_its_variants():
+    content, width, height, variants = resize_image(
+        rotated_jpeg(1600, 800),
+        base_width=400,
+        variant_widths=(200, 1000),
+        variant_formats=("png",),
+    )
+
+    assert (width, height) == (400, 800)
+    with Image.open(BytesIO(content)) as img:
+        assert img.size == (400, 800)
+    # 1000 is wider than the upright image and skipped
+    assert [(w, fmt) for w, fmt, _ in variants] == [(200, "png")]
+    with Image.open(BytesIO(variants[0][2])) as img:
+        assert img.size == (200, 400)
+
+
+def test_variant_urls_only_lists_rendered_variants():
+    handler = ImageHandler()
+    stored_file = StoredFile(object_key="common/a.png", variants={"webp": [320, 640]})
+
+    assert handler.variant_urls(stored_file) == {
+        "webp": {
+            320: f"{handler.cdn_url}/common/a_320.webp",
+            640: f"{handler.cdn_url}/common/a_640.webp",
+        }
+    }
+    assert handler.variant_urls(StoredFile(object_key="common/b.txt")) == {}
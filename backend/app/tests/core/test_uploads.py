@@ -0,0 +1,121 @@
+import asyncio
+import dataclasses
+import os
+from io import BytesIO
+
+import boto3
+import pytest
+from fastapi import HTTPException, UploadFile
+from moto import mock_aws
+from sqlalchemy.orm import sessionmaker
+
+import core.images
+from core.images import ImageHandler, UploadTooLarge
+from models.stored_file import READY, StoredFile
+
+BUCKET: str = "uploads"
+# The smallest part S3 accepts
+PART_SIZE: int = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(
+        core.images,
+        "settings",
+        dataclasses.replace(core.images.settings, upload_part_size=PART_SIZE),
+    )
+    with mock_aws():
+        client = boto3.client(
+            "s3",
+            region_name="us-east-1",
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+        )
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(core.images, "get_storage_client", lambda: client)
+        image_handler = ImageHandler()
+        image_handler.bucket_name = BUCKET
+        yield image_handler
+
+
+def test_small_file_is_a_single_put(handler):
+    size = handler.upload_fileobj(
+        BytesIO(b"x" * 1024), "common/small.txt", "text/plain"
+    )
+
+    head = handler.client.head_object(Bucket=BUCKET, Key="common/small.txt")
+    assert size == 1024
+    assert head["ContentLength"] == 1024
+    assert "-" not in head["ETag"]
+
+
+def test_large_file_is_uploaded_in_parts(handler):
+    content: bytes = os.urandom(2 * PART_SIZE + 1024)
+
+    size = handler.upload_fileobj(BytesIO(content), "common/large.bin", "image/png")
+
+    head = handler.client.head_object(Bucket=BUCKET, Key="common/large.bin")
+    body = handler.client.get_object(Bucket=BUCKET, Key="common/large.bin")["Body"]
+    assert size == len(content)
+    assert head["ContentType"] == "image/png"
+    # Multipart ETags end with the number of parts
+    assert head["ETag"].strip('"').endswith("-3")
+    assert body.read() == content
+
+
+def test_upload_over_the_limit_is_aborted(handler):
+    content: bytes = b"x" * (2 * PART_SIZE + 1024)
+
+    with pytest.raises(UploadTooLarge):
+        handler.upload_fileobj(
+            BytesIO(content), "common/huge.bin", "image/png", max_bytes=PART_SIZE
+        )
+
+    assert "Contents" not in handler.client.list_objects_v2(Bucket=BUCKET)
+    assert "Uploads" not in handler.client.list_multipart_uploads(Bucket=BUCKET)
+
+
+def test_declared_size_over_the_limit_is_rejected(handler, monkeypatch):
+    monkeypatch.setattr(
+        core.images,
+        "settings",
+        dataclasses.replace(core.images.settings, upload_max_bytes=1024),
+    )
+    upload = UploadFile(BytesIO(b"x" * 2048), filename="big.txt", size=2048)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(handler.save_image(upload, resize=False))
+
+    assert error.value.status_code == 413
+    assert "Contents" not in handler.client.list_objects_v2(Bucket=BUCKET)
+
+
+def test_failed_delete_keeps_the_reference_for_a_retry(handler, db_engine, monkeypatch):
+    Session = sessionmaker(bind=db_engine, expire_on_commit=False)
+    monkeypatch.setattr(core.images, "SessionLocal", Session)
+    object_key: str = "common/photo.jpg"
+    with Session() as db:
+        db.add(StoredFile(hash="f" * 64, object_key=object_key, status=READY))
+        db.commit()
+    for key in (object_key, handler.original_key(object_key)):
+        handler.client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+    file_url: str = f"{handler.cdn_url}/{object_key}"
+    delete_objects = handler.client.delete_objects
+
+    def fail_on_original(**kwargs):
+        response = delete_objects(**kwargs)
+        response["Errors"] = [{"Key": handler.original_key(object_key)}]
+        return response
+
+    monkeypatch.setattr(handler.client, "delete_objects", fail_on_original)
+    assert handler.remove_files([file_url]) == {file_url: False}
+    with Session() as db:
+        stored_file = db.query(StoredFile).filter_by(object_key=object_key).one()
+        assert stored_file.ref_count == 1
+
+    monkeypatch.setattr(handler.client, "delete_objects", delete_objects)
+    assert handler.remove_files([file_url]) == {file_url: True}
+    assert "Contents" not in handler.client.list_objects_v2(Bucket=BUCKET)
+    with Session() as db:
+        assert db.query(StoredFile).filter_by(object_key=object_key).first() is None
@@ -0,0 +1,163 @@
+import asyncio
+import uuid
+from typing import Callable, List, Optional
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.cache import TTLCache
+from core.versioning import etag
+from crud.base import CRUDBase
+from db.session import get_async_database_url
+from models.user import User
+
+
+class UserRow(BaseModel):
+    email: str
+    hashed_password: str
+    first_name: Optional[str] = None
+
+
+orm_crud = CRUDBase(User)
+lean_crud = CRUDBase(User, lean_writes=True)
+cached_crud = CRUDBase(User, cache=TTLCache(), lean_writes=True)
+
+
+def async_engine(db_engine):
+    return create_async_engine(
+        get_async_database_url(db_engine.url.render_as_string(hide_password=False))
+    )
+
+
+@pytest.fixture
+def statements(db_engine):
+    """SQL statements sent to the database while the test runs."""
+    executed: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+def count_statements(statements: List[str], call: Callable[[], object]) -> int:
+    statements.clear()
+    call()
+    return len(statements)
+
+
+def new_row() -> UserRow:
+    return UserRow(email=f"{uuid.uuid4().hex}@example.com", hashed_password="hash")
+
+
+def test_lean_create_is_a_single_statement(db_session, statements):
+    orm_count = count_statements(
+        statements, lambda: orm_crud.create(db_session, obj_in=new_row())
+    )
+    lean_count = count_statements(
+        statements, lambda: lean_crud.create(db_session, obj_in=new_row())
+    )
+
+    assert lean_count == 1
+    assert lean_count < orm_count
+
+
+def test_lean_create_returns_loaded_object(db_session, statements):
+    row = new_row()
+    user = lean_crud.create(db_session, obj_in=row)
+
+    statements.clear()
+    assert user.id is not None
+    assert user.email == row.email
+    assert statements == []
+
+
+def test_lean_update_is_a_single_statement(db_session, statements):
+    orm_user = orm_crud.create(db_session, obj_in=new_row())
+    lean_user = lean_crud.create(db_session, obj_in=new_row())
+
+    orm_count = count_statements(
+        statements,
+        lambda: orm_crud.update(
+            db_session, db_obj=orm_user, obj_in={"first_name": "Orm"}
+        ),
+    )
+    lean_count = count_statements(
+        statements,
+        lambda: lean_crud.update(
+            db_session, db_obj=lean_user, obj_in={"first_name": "Lean"}
+        ),
+    )
+
+    assert lean_count == 1
+    assert lean_count < orm_count
+    assert lean_user.first_name == "Lean"
+
+
+def test_lean_update_without_changes_sends_nothing(db_session, statements):
+    user = lean_crud.create(db_session, obj_in=new_row())
+
+    assert (
+        count_statements(
+            statements,
+            lambda: lean_crud.update(
+                db_session, db_obj=user, obj_in={"email": user.email}
+            ),
+        )
+        == 0
+    )
+
+
+def test_lean_update_without_changes_checks_if_match(db_session, statements):
+    user = lean_crud.create(db_session, obj_in=new_row())
+    current_etag = etag(user)
+
+    count = count_statements(
+        statements,
+        lambda: lean_crud.update(
+            db_session, db_obj=user, obj_in={}, if_match=current_etag
+        ),
+    )
+    assert count == 1
+
+    # Another process updates the row, the loaded object does not know
+    db_session.execute(
+        update(User).where(User.id == user.id).values(version=User.version + 1)
+    )
+    db_session.commit()
+
+    with pytest.raises(HTTPException) as error:
+        lean_crud.update(db_session, db_obj=user, obj_in={}, if_match=current_etag)
+    assert error.value.status_code == 412
+
+
+def test_lean_update_of_cached_object_writes_values_it_believes_unchanged(
+    db_engine, db_session
+):
+    user = lean_crud.create(db_session, obj_in=new_row())
+    user_id = user.id
+
+    async def update_from_cache() -> None:
+        engine = async_engine(db_engine)
+        async with AsyncSession(engine) as db:
+            await cached_crud.aget_cached(db, user_id)
+            # Another worker renames the user, the cached copy does not know
+            await db.execute(
+                update(User).where(User.id == user_id).values(first_name="Other")
+            )
+            await db.commit()
+        async with AsyncSession(engine) as db:
+            cached = await cached_crud.aget_cached(db, user_id)
+            assert cached.first_name is None
+            await cached_crud.aupdate(db, db_obj=cached, obj_in={"first_name": None})
+        await engine.dispose()
+
+    asyncio.run(update_from_cache())
+
+    db_session.expire_all()
+    assert db_session.get(User, user_id).first_name is None